@@ -17,26 +17,39 @@ from hlt import constants
 # This library contains direction metadata to better interface with the game.
 from hlt.positionals import Direction, Position
 
+import argparse
+import json
 import operator
-
-""" <<<Game Begin>>> """
-
-# This game object contains the initial game state.
-game = hlt.Game()
-# At this point "game" variable is populated with initial map data.
-# This is a good place to do computationally expensive start-up pre-processing.
-# As soon as you call "ready" function below, the 2 second per turn timer will start.
-ship_status = {}
+import os
+import sys
+import time
 
 possible_direction = [Direction.North, Direction.South, Direction.East, Direction.West]
 
-game.ready("ScapoBot")
-
-# Now that your bot is initialized, save a message to yourself in the log file with some important information.
-#   Here, you log here your id, which you can always fetch from the game object by using my_id.
-logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
-
-""" <<<Game Loop>>> """
+class Parameters:
+    """Tunable thresholds of the bot, defaults are the hand picked values"""
+    def __init__(self, sweet_spot_halite=350, halite_coeff_max=1.2, low_halite=50, sweet_spot_radius=15,
+                 sweet_spot_count=3, sweet_spot_attraction=2.5, return_halite=900, max_ships_small=26,
+                 max_ships_large=28, dropoff_distance=10, self_destruct_turns=25):
+        self.sweet_spot_halite = sweet_spot_halite
+        self.halite_coeff_max = halite_coeff_max
+        self.low_halite = low_halite
+        self.sweet_spot_radius = sweet_spot_radius
+        self.sweet_spot_count = sweet_spot_count
+        self.sweet_spot_attraction = sweet_spot_attraction
+        self.return_halite = return_halite
+        self.max_ships_small = max_ships_small
+        self.max_ships_large = max_ships_large
+        self.dropoff_distance = dropoff_distance
+        self.self_destruct_turns = self_destruct_turns
+
+    @staticmethod
+    def load(path):
+        """Load parameters from JSON file, missing ones keep their default"""
+        with open(path) as params_file:
+            return Parameters(**json.load(params_file))
+
+DEFAULT_PARAMETERS = Parameters()
 
 def get_random_move(ship, game_map, avoid_moves, shipyards):
     """Generate random move with some checking and addition to avoidance list"""
@@ -61,9 +74,9 @@ def cheap_navigation_2(ship, game_map, avoid_moves, destination, myself):
     forbiden_slots.append(destination.directional_offset(Direction.South))
     forbiden_slots.append(forbiden_slots[2].directional_offset(Direction.South))
 
-    logging.info("Possible directions: {}".format(directions))
-    logging.info("Avoid moves: {}".format(avoid_moves))
-    logging.info("Forbiden slots: {}".format(forbiden_slots))
+    logging.debug("Possible directions: %s", directions)
+    logging.debug("Avoid moves: %s", avoid_moves)
+    logging.debug("Forbiden slots: %s", forbiden_slots)
 
     if len(directions) == 1:
         new_position = ship.position.directional_offset(directions[0])
@@ -166,7 +179,7 @@ def cheap_navigation(ship, game_map, avoid_moves, destination):
     x_dist = destination.x - ship.position.x
     y_dist = destination.y - ship.position.y
 
-    logging.info("Navi: shipid {} x_dist {} y_dist {}".format(ship.id, x_dist, y_dist))
+    logging.debug("Navi: shipid %s x_dist %s y_dist %s", ship.id, x_dist, y_dist)
     
     if x_dist > 0 or (x_dist < - game_map.width // 2):
         new_position = ship.position.directional_offset(Direction.East)
@@ -345,38 +358,38 @@ def get_distance_to_dropoff(ship, game_map, myself):
 
     return closest_distance
 
-def get_sweet_spots(game_map, turn_number):
+def get_sweet_spots(game_map, turn_number, params=DEFAULT_PARAMETERS):
     """Return array of good spots on map"""
     good_areas = []
     max_turn = 25*(game_map.width - 32)/8 + 401
-    halite_coeff_max = 1.2
+    halite_coeff_max = params.halite_coeff_max
 
     halite_coeff = (max_turn - (max_turn / 2))/turn_number
-    logging.info("Halite coeff: {}".format(halite_coeff))
+    logging.info("Halite coeff: %s", halite_coeff)
 
     halite_coeff = halite_coeff_max if halite_coeff > halite_coeff_max else halite_coeff
 
     for x in range(game_map.width):
         for y in range(game_map.height):
             pos = Position(x,y)
-            if game_map[pos].halite_amount > (350 * halite_coeff):
+            if game_map[pos].halite_amount > (params.sweet_spot_halite * halite_coeff):
                 good_areas.append(pos)
 
     return good_areas
 
-def sort_sweet_spots(game_map, act_position, good_spots):
-    """Return 3 closest positions from good spots closest to actual position"""
+def sort_sweet_spots(game_map, act_position, good_spots, params=DEFAULT_PARAMETERS):
+    """Return 3 (sweet_spot_count) closest positions from good spots closest to actual position"""
     distance_list = {}
 
     for good_spot in good_spots:
         distance = game_map.calculate_distance(act_position, good_spot)
-        if distance < 15:
+        if distance < params.sweet_spot_radius:
             distance_list[distance] = good_spot
 
     dist_by_value = sorted(distance_list.items(), key=lambda kv: kv[0])
 
-    if len(dist_by_value) > 3:
-        dist_by_value = dist_by_value[:3]
+    if len(dist_by_value) > params.sweet_spot_count:
+        dist_by_value = dist_by_value[:params.sweet_spot_count]
 
     return_list = []
     for item in dist_by_value:
@@ -389,7 +402,7 @@ def check_direction_space(game_map, ship, myself, cmd_dir, avoid_moves):
     positions = [ship.position.directional_offset(cmd_dir)]
     positions.append(positions[-1].directional_offset(cmd_dir))
     positions.append(positions[-1].directional_offset(cmd_dir))
-    logging.info("Direction space: {}".format(positions))
+    logging.debug("Direction space: %s", positions)
     ship_present = False
 
     for position in positions:
@@ -449,24 +462,60 @@ def get_dropoff_list(myself):
     """Get list of dropoff positions"""
     dropoff_positions = []
 
-    dropoffs = me.get_dropoffs()
+    dropoffs = myself.get_dropoffs()
     
     for dropoff in dropoffs:
         dropoff_positions.append(dropoff.position)
 
-    dropoff_positions = dropoff_positions + me.shipyard.position
+    dropoff_positions.append(myself.shipyard.position)
 
     return dropoff_positions
 
-while True:
-    # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
-    #   running update_frame().
-    game.update_frame()
+def ship_priority(ship, game_map, myself, turns_left):
+    """Planning priority of ship, loaded ships late in the game or boxed in by other ships go first"""
+    distance = get_distance_to_dropoff(ship, game_map, myself)
+    priority = ship.halite_amount - distance
+
+    if turns_left <= distance + 5:
+        priority += constants.MAX_HALITE
+
+    for position in ship.position.get_surrounding_cardinals():
+        if game_map[position].is_occupied:
+            priority += 100
+
+    return priority
+
+def get_budget_move(ship, game_map, avoid_moves, scheduler):
+    """Repeat cached move of ship if target is still free, otherwise stay still"""
+    move = scheduler.cached_move(ship)
+    new_position = game_map.normalize(ship.position.directional_offset(move))
+    if move != Direction.Still and (new_position in avoid_moves or game_map[new_position].is_occupied):
+        move = Direction.Still
+        new_position = game_map.normalize(ship.position)
+    avoid_moves.append(new_position)
+    return move
+
+def play_turn(game, ship_status, scheduler, params=DEFAULT_PARAMETERS, assigner=None, pathfinder=None,
+              dropoff_planner=None):
+    """Plan moves of all ships and ship spawning for actual turn, return command queue"""
     # You extract player metadata and the updated map metadata here for convenience.
     me = game.me
     game_map = game.game_map
     # logging.info("Game map size: {},{}".format(game_map.width, game_map.height))
-    good_spots = get_sweet_spots(game_map, game.turn_number)
+    with game.profiler.scope("sweet_spots"):
+        good_spots = get_sweet_spots(game_map, game.turn_number, params)
+    # With an hlt.assignment.FleetAssigner every harvesting ship gets its own sweet spot
+    #   instead of all ships taking their closest one
+    assigned_spots = {}
+    if assigner is not None:
+        with game.profiler.scope("assignment"):
+            harvesting = [ship for ship in me.get_ships() if ship_status.get(ship.id) != "returning"]
+            assigned_spots = assigner.assign(harvesting, good_spots, game_map)
+
+    # With an hlt.dropoffs.DropoffPlanner full ships build where the neighbourhood scores close to the best site
+    if dropoff_planner is not None:
+        with game.profiler.scope("dropoff_sites"):
+            dropoff_planner.update(game)
 
     if game_map.width > 38:
         max_dropoff = 1
@@ -476,7 +525,7 @@ while True:
     max_turn = 25*(game_map.width - 32)/8 + 401
 
     self_destruct = False
-    if game.turn_number > max_turn - 25:
+    if game.turn_number > max_turn - params.self_destruct_turns:
         self_destruct = True
 
     halite_available = me.halite_amount
@@ -498,9 +547,33 @@ while True:
     # logging.info("Dropoffs: {}".format(dropoff_positions))
     # logging.info("Turn start: {}".format(ship_status))
 
-    for ship in me.get_ships():
+    # Plan most valuable ships first, ships left when time runs out repeat their last move
+    ordered_ships = scheduler.order(me.get_ships(), lambda ship: ship_priority(ship, game_map, me, max_turn - game.turn_number))
+
+    # With an hlt.pathfinding.CooperativePlanner returning ships follow paths that reserve their cells
+    #   for the next turns, instead of only looking one move ahead
+    planned_moves = {}
+    if pathfinder is not None and not self_destruct:
+        with game.profiler.scope("pathfinding"):
+            returning = [ship for ship in me.get_ships() if ship_status.get(ship.id) == "returning" and ship.position not in dropoff_positions]
+            returning.sort(key=lambda ship: -ship_priority(ship, game_map, me, max_turn - game.turn_number))
+            goals = {}
+            for ship in returning:
+                close_doff = get_closest_dropoff(ship, game_map, me)
+                goals[ship.id] = (close_doff.x, close_doff.y)
+            blocked = [(other.position.x, other.position.y) for player in game.players.values()
+                       for other in player.get_ships() if other.id not in goals]
+            planned_moves = pathfinder.plan(game.turn_number, returning, goals, blocked, game_map)
+            for ship in returning:
+                avoid_moves.append(game_map.normalize(ship.position.directional_offset(planned_moves[ship.id])))
+
+    for ship in ordered_ships:
         # For each of your ships, move randomly if the ship is on a low halite location or the ship is full.
         #   Else, collect halite.
+        if scheduler.over_budget:
+            command_queue.append(ship.move(get_budget_move(ship, game_map, avoid_moves, scheduler)))
+            continue
+
         harvesting_ships = sum(map(("harvesting").__eq__, ship_status.values()))
 
         if ship.id not in ship_status:
@@ -547,11 +620,15 @@ while True:
                         else:
                             ship_status[ship.id] = "takeoffsouth"
                         continue
+            elif ship.id in planned_moves:
+                # Already in avoid_moves
+                command_queue.append(ship.move(planned_moves[ship.id]))
+                continue
             else:
                 close_doff = get_closest_dropoff(ship, game_map, me)
                 move = cheap_navigation_2(ship, game_map, avoid_moves, close_doff, me)
                 directions_to_dropoff = [ship.position.directional_offset(Direction.East), ship.position.directional_offset(Direction.West)]
-                logging.info("Chap move 2: ship id {} move {}".format(ship.id, move))
+                logging.debug("Chap move 2: ship id %s move %s", ship.id, move)
                 # Don't zig zag move infront of dropoff
                 if close_doff in directions_to_dropoff:
                     if ship.position.directional_offset(move) not in directions_to_dropoff:
@@ -566,17 +643,20 @@ while True:
                 actual_cell = ship.position
                 best_cell = ship.position
                 # logging.info("Actual: {} Best: {}".format(actual_cell, best_cell))
-                if game_map[best_cell].halite_amount < 50:
+                if game_map[best_cell].halite_amount < params.low_halite:
                     """If actual cell halite amount is low then look for new direction"""
                     for cell in surroundings:
                         if game_map[best_cell].halite_amount < game_map[cell].halite_amount/2 and not game_map[cell].is_occupied and cell not in avoid_moves and cell not in dropoff_positions:
                             best_cell = cell
                     # Sort list of good spots based on ship position
-                    sweet_spots = sort_sweet_spots(game_map, ship.position, good_spots)
+                    if assigner is not None:
+                        sweet_spots = [assigned_spots[ship.id]] if assigned_spots.get(ship.id) is not None else []
+                    else:
+                        sweet_spots = sort_sweet_spots(game_map, ship.position, good_spots, params)
                     
                     if len(sweet_spots) > 0:
                         # Continue on the way to sweet spot only in actual surrounding is not good enought
-                        if game_map[sweet_spots[0]].halite_amount > game_map[best_cell].halite_amount*2.5:
+                        if game_map[sweet_spots[0]].halite_amount > game_map[best_cell].halite_amount*params.sweet_spot_attraction:
                             best_cell = sweet_spots[0]
 
                 # logging.info("Selected: {}".format(best_cell))
@@ -586,14 +666,14 @@ while True:
                         # If there is no halite inactual cell move
                         move = get_random_move(ship, game_map, avoid_moves, dropoff_positions)
                         if move is not None:
-                            logging.info("Random move: {}".format(move))
+                            logging.debug("Random move: %s", move)
                             command_queue.append(ship.move(move))
                         else:
                             command_queue.append(ship.stay_still())
                     else:
                         command_queue.append(ship.stay_still())
                 else:
-                    if ship.halite_amount > 900 and (game_map[best_cell].halite_amount * 0.25) < (game_map[ship.position].halite_amount * 0.1):
+                    if ship.halite_amount > params.return_halite and (game_map[best_cell].halite_amount * 0.25) < (game_map[ship.position].halite_amount * 0.1):
                         if game_map[ship.position].halite_amount > 100:
                             avoid_moves.append(game_map.normalize(ship.position.directional_offset(Direction.Still)))
                             command_queue.append(ship.stay_still())
@@ -601,14 +681,14 @@ while True:
                             ship_status[ship.id] = "returning"
                             close_doff = get_closest_dropoff(ship, game_map, me)
                             move = cheap_navigation_2(ship, game_map, avoid_moves, close_doff, me)
-                            logging.info("Chap move 2: ship id {} move {}".format(ship.id, move))
+                            logging.debug("Chap move 2: ship id %s move %s", ship.id, move)
                             avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                             command_queue.append(ship.move(move))
                     else:
                         cmd_dir = get_target_direction(actual_cell, best_cell)[0]
                         # logging.info("ADirection: {}".format(cmd_dir))
                         move = check_direction_space(game_map, ship, me, cmd_dir, avoid_moves)
-                        logging.info("Returned move: ship id {} move {}".format(ship.id, move))
+                        logging.debug("Returned move: ship id %s move %s", ship.id, move)
                         avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                         # move = game_map.naive_navigate(ship, best_cell)
                         command_queue.append(ship.move(move))
@@ -644,8 +724,12 @@ while True:
                     command_queue.append(ship.move(Direction.Still))
             continue
         elif ship.is_full:
-            distance_to_base = get_distance_to_dropoff(ship, game_map, me)
-            if dropoff_count < max_dropoff and distance_to_base > 10 and game_map[ship.position].halite_amount > 200 and me.halite_amount >= constants.DROPOFF_COST:
+            if dropoff_planner is not None:
+                good_site = dropoff_planner.is_good_site(ship.position)
+            else:
+                distance_to_base = get_distance_to_dropoff(ship, game_map, me)
+                good_site = distance_to_base > params.dropoff_distance and game_map[ship.position].halite_amount > 200
+            if dropoff_count < max_dropoff and good_site and me.halite_amount >= constants.DROPOFF_COST:
                 command_queue.append(ship.make_dropoff())
                 halite_available -= 4000
             else:
@@ -653,28 +737,31 @@ while True:
                 close_doff = get_closest_dropoff(ship, game_map, me)
                 # move = cheap_navigation(ship, game_map, avoid_moves, close_doff)
                 move = cheap_navigation_2(ship, game_map, avoid_moves, close_doff, me)
-                logging.info("Chap move 2: ship id {} move {}".format(ship.id, move))
+                logging.debug("Chap move 2: ship id %s move %s", ship.id, move)
                 avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                 command_queue.append(ship.move(move))
             continue
 
         if game_map[ship.position].halite_amount < constants.MAX_HALITE / 10 or ship.is_full:
-            logging.info("Bad part id: {}".format(ship.id))
+            logging.debug("Bad part id: %s", ship.id)
             surroundings = ship.position.get_surrounding_cardinals()
             actual_cell = ship.position
             best_cell = ship.position
             # logging.info("Actual: {} Best: {}".format(actual_cell, best_cell))
-            if game_map[best_cell].halite_amount < 50:
+            if game_map[best_cell].halite_amount < params.low_halite:
                 """If actual cell halite amount is low then look for new direction"""
                 for cell in surroundings:
                     if game_map[best_cell].halite_amount < game_map[cell].halite_amount/2 and not game_map[cell].is_occupied and cell not in avoid_moves and cell not in dropoff_positions:
                         best_cell = cell
                 # Sort list of good spots based on ship position
-                sweet_spots = sort_sweet_spots(game_map, ship.position, good_spots)
+                if assigner is not None:
+                    sweet_spots = [assigned_spots[ship.id]] if assigned_spots.get(ship.id) is not None else []
+                else:
+                    sweet_spots = sort_sweet_spots(game_map, ship.position, good_spots, params)
                 
                 if len(sweet_spots) > 0:
                     # Continue on the way to sweet spot only in actual surrounding is not good enought
-                    if game_map[sweet_spots[0]].halite_amount > game_map[best_cell].halite_amount*2.5:
+                    if game_map[sweet_spots[0]].halite_amount > game_map[best_cell].halite_amount*params.sweet_spot_attraction:
                         best_cell = sweet_spots[0]
 
             # logging.info("Selected: {}".format(best_cell))
@@ -683,7 +770,7 @@ while True:
                 if game_map[best_cell].halite_amount == 0:
                     move = get_random_move(ship, game_map, avoid_moves, dropoff_positions)
                     if move is not None:
-                        logging.info("Random move: {}".format(move))
+                        logging.debug("Random move: %s", move)
                         command_queue.append(ship.move(move))
                     else:
                         command_queue.append(ship.stay_still())
@@ -694,7 +781,7 @@ while True:
                 cmd_dir = get_target_direction(actual_cell, best_cell)[0]
                 # logging.info("ADirection: {}".format(cmd_dir))
                 move = check_direction_space(game_map, ship, me, cmd_dir, avoid_moves)
-                logging.info("Returned move: ship id {} move {}".format(ship.id, move))
+                logging.debug("Returned move: ship id %s move %s", ship.id, move)
                 avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                 # move = game_map.naive_navigate(ship, best_cell)
                 command_queue.append(ship.move(move))
@@ -707,9 +794,9 @@ while True:
 
     ship_optimal_count = turn_no // 5
     if game_map.width < 35:
-        max_ships = 26 + dropoff_count * 3
+        max_ships = params.max_ships_small + dropoff_count * 3
     else:
-        max_ships = 28 + dropoff_count * 3
+        max_ships = params.max_ships_large + dropoff_count * 3
 
     ship_optimal_count = ship_optimal_count if ship_optimal_count < max_ships else max_ships
 
@@ -717,5 +804,82 @@ while True:
         command_queue.append(me.shipyard.spawn())
 
     # logging.info("Ship types: {}".format(ship_status))
-    # Send your moves back to the game environment, ending this turn.
-    game.end_turn(command_queue)
+    return command_queue
+
+if __name__ == "__main__":
+    """ <<<Game Begin>>> """
+
+    # Thresholds can be overridden by a JSON file, e.g. one written by tune_params.py
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--params", help="JSON file with Parameters overrides")
+    parser.add_argument("--debug-log", action="store_true",
+                        help="keep the last turns' per-ship debug messages for bot-{id}-crash.log")
+    parser.add_argument("--teacher", metavar="DIR", help="record every decision into a dataset shard in DIR")
+    parser.add_argument("--assign", action="store_true", help="assign sweet spots to ships fleet-wide")
+    parser.add_argument("--cooperative", action="store_true", help="plan returning ships' paths with reservations")
+    parser.add_argument("--dropoffs", action="store_true", help="build dropoffs on the best scored sites")
+    parser.add_argument("--profile", action="store_true", help="write per-turn timings to bot-{id}-timing.jsonl")
+    parser.add_argument("--sample-every", type=int, default=0,
+                        help="write sampled stacks of every Nth turn to bot-{id}-turn-{turn}.folded")
+    parser.add_argument("--sample-threshold", type=float,
+                        help="also write sampled stacks of turns slower than this many seconds")
+    args, _ = parser.parse_known_args()
+    params = Parameters.load(args.params) if args.params else DEFAULT_PARAMETERS
+
+    # This game object contains the initial game state. With --debug-log, per-ship debug messages are kept in
+    #   memory for the last 3 turns and written to bot-{id}-crash.log if the bot crashes; without it they are
+    #   dropped before a record is built.
+    game = hlt.Game(log_level=logging.INFO, log_ring_turns=3 if args.debug_log else 0, log_ring_level=logging.DEBUG,
+                    profile=args.profile, sample_every=args.sample_every, sample_threshold=args.sample_threshold)
+    # At this point "game" variable is populated with initial map data.
+    # This is a good place to do computationally expensive start-up pre-processing.
+    # As soon as you call "ready" function below, the 2 second per turn timer will start.
+    ship_status = {}
+    scheduler = hlt.scheduling.ShipScheduler(time_budget=1.5)
+    teacher = None
+    if args.teacher:
+        # Needs NumPy, which the bot does not otherwise
+        from rl.teacher import TeacherLogger
+        os.makedirs(args.teacher, exist_ok=True)
+        teacher = TeacherLogger(game, os.path.join(args.teacher, "teacher-{}-{}-p{}".format(
+            int(time.time()), os.getpid(), game.my_id)))
+
+    assigner = None
+    if args.assign:
+        from hlt.assignment import FleetAssigner
+        assigner = FleetAssigner(game.game_map.width, game.game_map.height, radius=params.sweet_spot_radius)
+    pathfinder = hlt.pathfinding.CooperativePlanner(game.game_map.width, game.game_map.height) if args.cooperative else None
+    dropoff_planner = None
+    if args.dropoffs:
+        from hlt.dropoffs import DropoffPlanner
+        dropoff_planner = DropoffPlanner(game, min_distance=params.dropoff_distance)
+
+    game.ready("ScapoBot")
+
+    # Now that your bot is initialized, save a message to yourself in the log file with some important information.
+    #   Here, you log here your id, which you can always fetch from the game object by using my_id.
+    logging.info("Successfully created bot! My Player ID is %s.", game.my_id)
+
+    # Time the expensive helpers per turn with --profile
+    for function_name in ("cheap_navigation_2", "selfdestruct_navigation", "check_direction_space", "get_random_move", "sort_sweet_spots"):
+        game.profiler.instrument(sys.modules[__name__], function_name, timed=True)
+
+    """ <<<Game Loop>>> """
+
+    while True:
+        # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
+        #   running update_frame().
+        game.update_frame()
+        # Counted from when the frame arrived, so parsing it is part of the budget
+        scheduler.start_turn(game.turn_start)
+        if teacher is not None:
+            teacher.observe(game)
+        command_queue = play_turn(game, ship_status, scheduler, params, assigner, pathfinder, dropoff_planner)
+        if teacher is not None:
+            teacher.record(game, command_queue, ship_status)
+        # Send your moves back to the game environment, ending this turn.
+        scheduler.end_turn(command_queue)
+        game.end_turn(command_queue)
+        if teacher is not None and game.turn_number == constants.MAX_TURNS:
+            # The moves are sent, waiting for the writer no longer costs turn time
+            teacher.close()
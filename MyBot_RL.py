@@ -4,6 +4,8 @@
 # This library allows you to generate random numbers.
 import random
 
+import argparse
+
 # Logging allows you to save messages for yourself. This is required because the regular STDOUT
 #   (print statements) are reserved for the engine-bot communication.
 import logging
@@ -16,18 +18,32 @@ from hlt import constants
 
 # This library contains direction metadata to better interface with the game.
 from hlt.positionals import Direction, Position
+from hlt.features import EgocentricCrops, FeatureBuilder
+from hlt.inference import Network
 
 import operator
 import numpy as np
-from collections import deque
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Conv2D
-from tensorflow.keras.optimizers import Adam
+
+from rl.dqn import batch_update
+from rl.experience import ExperienceRecorder
+from rl.models import policy_network
+from rl.replay_buffer import ReplayBuffer
+from rl.replay_store import ReplayStore
 
 """ <<<Game Begin>>> """
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--policy", help="model exported by rl/export.py; ships are then moved by it instead of the heuristics")
+parser.add_argument("--epsilon", type=float, default=0.0, help="exploration rate of the policy")
+parser.add_argument("--experience", help="replay store directory to record the policy's transitions into")
+parser.add_argument("--experience-capacity", type=int,
+                    help="transitions a new --experience store keeps before overwriting the oldest, default all")
+parser.add_argument("--experience-shard-size", type=int, default=65536, help="transitions per file of a new store")
+parser.add_argument("--profile", action="store_true", help="write per-turn timings to bot-{id}-timing.jsonl")
+args, _ = parser.parse_known_args()
+
 # This game object contains the initial game state.
-game = hlt.Game()
+game = hlt.Game(profile=args.profile)
 # At this point "game" variable is populated with initial map data.
 # This is a good place to do computationally expensive start-up pre-processing.
 # As soon as you call "ready" function below, the 2 second per turn timer will start.
@@ -35,11 +51,19 @@ ship_status = {}
 
 possible_direction = [Direction.North, Direction.South, Direction.East, Direction.West]
 
-game.ready("ScapoBot")
+features = FeatureBuilder(game)
 
-# Now that your bot is initialized, save a message to yourself in the log file with some important information.
-#   Here, you log here your id, which you can always fetch from the game object by using my_id.
-logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
+# Model actions, in output order
+ACTIONS = [Direction.Still, Direction.North, Direction.South, Direction.East, Direction.West]
+VIEW_SIZE = 15
+
+agent = None
+recorder = None
+if args.policy:
+    crops = EgocentricCrops(game.game_map.width, game.game_map.height, VIEW_SIZE)
+    if args.experience:
+        recorder = ExperienceRecorder(ReplayStore(args.experience, shard_size=args.experience_shard_size,
+                                                  capacity=args.experience_capacity))
 
 """ <<<Game Loop>>> """
 
@@ -66,9 +90,9 @@ def cheap_navigation_2(ship, game_map, avoid_moves, destination):
     forbiden_slots.append(destination.directional_offset(Direction.South))
     forbiden_slots.append(forbiden_slots[2].directional_offset(Direction.South))
 
-    logging.info("Possible directions: {}".format(directions))
-    logging.info("Avoid moves: {}".format(avoid_moves))
-    logging.info("Forbiden slots: {}".format(forbiden_slots))
+    logging.info("Possible directions: %s", directions)
+    logging.info("Avoid moves: %s", avoid_moves)
+    logging.info("Forbiden slots: %s", forbiden_slots)
 
     if len(directions) == 1:
         new_position = ship.position.directional_offset(directions[0])
@@ -171,7 +195,7 @@ def cheap_navigation(ship, game_map, avoid_moves, destination):
     x_dist = destination.x - ship.position.x
     y_dist = destination.y - ship.position.y
 
-    logging.info("Navi: shipid {} x_dist {} y_dist {}".format(ship.id, x_dist, y_dist))
+    logging.info("Navi: shipid %s x_dist %s y_dist %s", ship.id, x_dist, y_dist)
     
     if x_dist > 0 or (x_dist < - game_map.width // 2):
         new_position = ship.position.directional_offset(Direction.East)
@@ -357,7 +381,7 @@ def get_sweet_spots(game_map, turn_number):
     halite_coeff_max = 1.2
 
     halite_coeff = (max_turn - (max_turn / 2))/turn_number
-    logging.info("Halite coeff: {}".format(halite_coeff))
+    logging.info("Halite coeff: %s", halite_coeff)
 
     halite_coeff = halite_coeff_max if halite_coeff > halite_coeff_max else halite_coeff
 
@@ -394,7 +418,7 @@ def check_direction_space(game_map, ship, myself, cmd_dir, avoid_moves):
     positions = [ship.position.directional_offset(cmd_dir)]
     positions.append(positions[-1].directional_offset(cmd_dir))
     positions.append(positions[-1].directional_offset(cmd_dir))
-    logging.info("Direction space: {}".format(positions))
+    logging.info("Direction space: %s", positions)
     ship_present = False
 
     for position in positions:
@@ -463,41 +487,64 @@ def get_dropoff_list(myself):
 
     return dropoff_positions
 
-def get_data(myself, game_map):
-    """Collect data to arrray for RL input"""
-    out_data = np.zeros([game_map.width, game_map.height, 4])
-
-    for x in range(game_map.width):
-        for y in range(game_map.height):
-            actual_position = Position(x, y)
-            out_data[x, y, 0] = game_map[actual_position].halite_amount
-            if game_map[actual_position].is_occupied:
-                out_data[x, y, 2] = 1
-            if game_map[actual_position].has_structure:
-                out_data[x, y, 3] = 1
-
-    ships = myself.get_ships()
-
-    for ship in ships:
-        out_data[ship.position.x, ship.position.y, 1] = ship.halite_amount
-        out_data[ship.position.x, ship.position.y, 2] = 2
-
-    return out_data
-
 class DQNAgent:
     """Deep Q learning agent for Halite"""
-    def __init__(self, game_dimension):
-        self.memory = deque(maxlen=2000)
+    def __init__(self, channels, view_size=VIEW_SIZE, memory_size=2000, prioritized=False, memory_dir=None,
+                 model=None):
+        # Keep transitions in a memory-mapped store on disk when a directory is given, e.g. for self-play datasets
+        if memory_dir is not None:
+            self.memory = ReplayStore(memory_dir)
+        else:
+            self.memory = ReplayBuffer(memory_size, prioritized=prioritized)
         self.gama = 0.95 # Discount rate
         self.eps = 0.2 # Exploration rate
         self.eps_min = 0.01 # Minimum exploration rate
         self.eps_decay = 0.997 # Epsilon decay
         self.learning_rate = 0.001 # Model learning rate
-        self.model = self.build_model()
-        self.state = (game_dimension, game_dimension, 5)
+        self.state = (view_size, view_size, channels) # One ship's egocentric view
+        self.random = np.random.default_rng()
+        # A given model, e.g. an exported hlt.inference.Network, is only used to act
+        self.model = model if model is not None else self.build_model()
 
     def build_model(self):
-        pass
+        return policy_network(self.state, len(ACTIONS), self.learning_rate)
+
+    def act_fleet(self, views, eps=None):
+        """Pick every ship's action from one forward pass over their stacked views, epsilon-greedy"""
+        count = len(views)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        eps = self.eps if eps is None else eps
+        with game.profiler.scope("policy_inference"):
+            q_values = np.asarray(self.model.predict_on_batch(views))
+        with game.profiler.scope("policy_selection"):
+            actions = q_values.argmax(axis=1)
+            explore = self.random.random(count) < eps
+            actions[explore] = self.random.integers(0, len(ACTIONS), explore.sum())
+        return actions
+
+    def remember(self, state, action, reward, next_state, done):
+        """Store transition, the buffer takes its state shape from the first one"""
+        self.memory.add(state, action, reward, next_state, done)
+
+    def replay(self, batch_size=16):
+        """Train model on random minibatch of remembered transitions in one batched update"""
+        if len(self.memory) < batch_size:
+            return
+        batch = self.memory.sample(batch_size)
+        _, td_errors = batch_update(self.model, batch, self.gama)
+        self.memory.update_priorities(batch.indices, td_errors)
+        self.eps = max(self.eps*self.eps_decay, self.eps_min)
+
+if args.policy:
+    # Loaded before ready, so it does not count against the first turn
+    agent = DQNAgent(features.features.shape[-1], model=Network.load(args.policy))
+
+game.ready("ScapoBot")
+
+# Now that your bot is initialized, save a message to yourself in the log file with some important information.
+#   Here, you log here your id, which you can always fetch from the game object by using my_id.
+logging.info("Successfully created bot! My Player ID is %s.", game.my_id)
 
 while True:
     # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
@@ -524,8 +571,26 @@ while True:
 
     exit_slot = me.shipyard.position
 
-    game_data = get_data(me, game_map)
-    logging.info("Game data: {}".format(game_data[10:15, 10:15, :]))
+    with game.profiler.scope("features"):
+        game_data = features.build(game)
+    # A copy, features.build fills the same array again next turn
+    logging.info("Game data: %s", game_data[10:15, 10:15, :].copy())
+
+    # With a policy, every ship's move comes out of a single batched model call
+    policy_moves = {}
+    if agent is not None:
+        fleet = me.get_ships()
+        with game.profiler.scope("policy_views"):
+            xs = np.fromiter((ship.position.x for ship in fleet), dtype=np.int64, count=len(fleet))
+            ys = np.fromiter((ship.position.y for ship in fleet), dtype=np.int64, count=len(fleet))
+            views = crops.gather(game_data, xs, ys)
+        actions = agent.act_fleet(views, args.epsilon)
+        policy_moves = {ship.id: ACTIONS[action] for ship, action in zip(fleet, actions)}
+        if recorder is not None:
+            structures = [me.shipyard.position] + [doff.position for doff in me.get_dropoffs()]
+            recorder.record(fleet, views, actions, structures)
+            if game.turn_number == constants.MAX_TURNS:
+                recorder.flush()
 
     # A command queue holds all the commands you will run this turn. You build this list up and submit it at the
     #   end of the turn.
@@ -543,6 +608,9 @@ while True:
     # logging.info("Turn start: {}".format(ship_status))
 
     for ship in me.get_ships():
+        if ship.id in policy_moves:
+            command_queue.append(ship.move(policy_moves[ship.id]))
+            continue
         # For each of your ships, move randomly if the ship is on a low halite location or the ship is full.
         #   Else, collect halite.
         harvesting_ships = sum(map(("harvesting").__eq__, ship_status.values()))
@@ -579,7 +647,7 @@ while True:
                 close_doff = get_closest_dropoff(ship, game_map, me)
                 # move = cheap_navigation(ship, game_map, avoid_moves, close_doff)
                 move = cheap_navigation_2(ship, game_map, avoid_moves, close_doff)
-                logging.info("Chap move 2: ship id {} move {}".format(ship.id, move))
+                logging.info("Chap move 2: ship id %s move %s", ship.id, move)
                 avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                 command_queue.append(ship.move(move))
                 continue
@@ -609,7 +677,7 @@ while True:
                     if game_map[best_cell].halite_amount == 0:
                         move = get_random_move(ship, game_map, avoid_moves, dropoff_positions)
                         if move is not None:
-                            logging.info("Random move: {}".format(move))
+                            logging.info("Random move: %s", move)
                             command_queue.append(ship.move(move))
                         else:
                             command_queue.append(ship.stay_still())
@@ -620,7 +688,7 @@ while True:
                     cmd_dir = get_target_direction(actual_cell, best_cell)[0]
                     # logging.info("ADirection: {}".format(cmd_dir))
                     move = check_direction_space(game_map, ship, me, cmd_dir, avoid_moves)
-                    logging.info("Returned move: ship id {} move {}".format(ship.id, move))
+                    logging.info("Returned move: ship id %s move %s", ship.id, move)
                     avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                     # move = game_map.naive_navigate(ship, best_cell)
                     command_queue.append(ship.move(move))
@@ -635,13 +703,13 @@ while True:
                 close_doff = get_closest_dropoff(ship, game_map, me)
                 # move = cheap_navigation(ship, game_map, avoid_moves, close_doff)
                 move = cheap_navigation_2(ship, game_map, avoid_moves, close_doff)
-                logging.info("Chap move 2: ship id {} move {}".format(ship.id, move))
+                logging.info("Chap move 2: ship id %s move %s", ship.id, move)
                 avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                 command_queue.append(ship.move(move))
             continue
 
         if game_map[ship.position].halite_amount < constants.MAX_HALITE / 10 or ship.is_full:
-            logging.info("Bad part id: {}".format(ship.id))
+            logging.info("Bad part id: %s", ship.id)
             surroundings = ship.position.get_surrounding_cardinals()
             actual_cell = ship.position
             best_cell = ship.position
@@ -665,7 +733,7 @@ while True:
                 if game_map[best_cell].halite_amount == 0:
                     move = get_random_move(ship, game_map, avoid_moves, dropoff_positions)
                     if move is not None:
-                        logging.info("Random move: {}".format(move))
+                        logging.info("Random move: %s", move)
                         command_queue.append(ship.move(move))
                     else:
                         command_queue.append(ship.stay_still())
@@ -676,7 +744,7 @@ while True:
                 cmd_dir = get_target_direction(actual_cell, best_cell)[0]
                 # logging.info("ADirection: {}".format(cmd_dir))
                 move = check_direction_space(game_map, ship, me, cmd_dir, avoid_moves)
-                logging.info("Returned move: ship id {} move {}".format(ship.id, move))
+                logging.info("Returned move: ship id %s move %s", ship.id, move)
                 avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
                 # move = game_map.naive_navigate(ship, best_cell)
                 command_queue.append(ship.move(move))
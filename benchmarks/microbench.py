@@ -0,0 +1,220 @@
+"""
+Microbenchmarks of hlt and MyBot hot functions on synthetic game states.
+
+Run from the repository root:
+
+    python -m benchmarks.microbench --output bench.json
+    python -m benchmarks.microbench --output new.json --compare bench.json
+
+Results are stored as JSON, one entry per function and game state, with the best and
+mean time of one run over all ships. --compare prints the change against an earlier file.
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from hlt.scheduling import ShipScheduler
+from hlt.snapshot import GameState
+
+import MyBot
+from .synthetic import SyntheticGame
+
+MAP_SIZES = (32, 40, 48, 56, 64)
+PLAYER_COUNTS = (2, 4)
+FLEET_SIZES = (10, 50, 100, 150)
+TURN_NUMBER = 150
+
+# Entries slower than this ratio against the compared file are flagged
+REGRESSION_RATIO = 1.1
+
+
+def measure(run, setup=None, repeat=5):
+    """
+    Times a function, calling setup untimed before every run.
+    :param run: Function to time
+    :param setup: Function called before each run, or None
+    :param repeat: How many runs to time
+    :return: Best and mean seconds of a run
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+def _set_stdin(lines):
+    text = "\n".join(lines) + "\n"
+
+    def setup():
+        sys.stdin = io.StringIO(text)
+    return setup
+
+
+def benchmarks(synthetic):
+    """
+    Builds the benchmarks of one game state.
+    :param synthetic: The SyntheticGame to benchmark on
+    :return: List of (name, calls per run, setup, run) tuples
+    """
+    game = synthetic.game(TURN_NUMBER)
+    game_map = game.game_map
+    me = game.me
+    ships = me.get_ships()
+    frame_lines = synthetic.frame_lines(TURN_NUMBER)
+    set_frame = _set_stdin(frame_lines)
+
+    def refresh():
+        set_frame()
+        game.update_frame()
+
+    targets = [player.shipyard.position for player in game.players.values()]
+    good_spots = MyBot.get_sweet_spots(game_map, TURN_NUMBER)
+
+    def calculate_distance():
+        for ship in ships:
+            for target in targets:
+                game_map.calculate_distance(ship.position, target)
+
+    def naive_navigate():
+        for ship in ships:
+            game_map.naive_navigate(ship, me.shipyard.position)
+
+    def sort_sweet_spots():
+        for ship in ships:
+            MyBot.sort_sweet_spots(game_map, ship.position, good_spots)
+
+    def cheap_navigation_2():
+        avoid_moves = []
+        for ship in ships:
+            move = MyBot.cheap_navigation_2(ship, game_map, avoid_moves, me.shipyard.position, me)
+            avoid_moves.append(game_map.normalize(ship.position.directional_offset(move)))
+
+    # A fleet in mid game: loaded ships heading home, the others harvesting
+    statuses = {ship.id: "returning" if ship.halite_amount > MyBot.DEFAULT_PARAMETERS.return_halite / 2
+                else "harvesting" for ship in ships}
+
+    def play_turn():
+        MyBot.play_turn(game, dict(statuses), ShipScheduler(time_budget=None))
+
+    state = GameState.from_game(game)
+    # Every ship mines, moves would mostly depend on the random positions
+    still_commands = {player_id: [ship.stay_still() for ship in player.get_ships()]
+                      for player_id, player in game.players.items()}
+
+    return [
+        ("GameMap._generate", 1, _set_stdin(synthetic.map_lines()), lambda: game_map._generate()),
+        ("Game.update_frame", 1, set_frame, game.update_frame),
+        ("GameMap.calculate_distance", len(ships) * len(targets), None, calculate_distance),
+        ("GameMap.naive_navigate", len(ships), refresh, naive_navigate),
+        ("MyBot.get_sweet_spots", 1, None, lambda: MyBot.get_sweet_spots(game_map, TURN_NUMBER)),
+        ("MyBot.sort_sweet_spots", len(ships), None, sort_sweet_spots),
+        ("MyBot.cheap_navigation_2", len(ships), refresh, cheap_navigation_2),
+        ("MyBot.play_turn", 1, refresh, play_turn),
+        ("GameState.from_game", 1, None, lambda: GameState.from_game(game)),
+        ("GameState.fork", 1, None, state.fork),
+        ("GameState.step", 1, None, lambda: state.step(still_commands)),
+    ]
+
+
+def run_all(map_sizes, player_counts, fleet_sizes, repeat, seed=0):
+    """
+    Runs every benchmark on every combination of game state parameters.
+    :return: List of result dicts
+    """
+    results = []
+    stdin = sys.stdin
+    try:
+        for map_size in map_sizes:
+            for num_players in player_counts:
+                for ships_per_player in fleet_sizes:
+                    synthetic = SyntheticGame(map_size, num_players, ships_per_player, seed)
+                    for name, calls, setup, run in benchmarks(synthetic):
+                        best, mean = measure(run, setup, repeat)
+                        results.append({
+                            "name": name,
+                            "map_size": map_size,
+                            "players": num_players,
+                            "ships": ships_per_player,
+                            "calls": calls,
+                            "best_s": best,
+                            "mean_s": mean,
+                        })
+                        print("{:<28} {:>2}x{:<2} {}p {:>3} ships  {:>9.3f} ms".format(
+                            name, map_size, map_size, num_players, ships_per_player, best * 1000), file=sys.stderr)
+    finally:
+        sys.stdin = stdin
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Prints how every result changed against a baseline result file.
+    :param results: Result dicts of this run
+    :param baseline: Parsed baseline result file
+    :return: Number of regressed entries
+    """
+    def key(result):
+        return result["name"], result["map_size"], result["players"], result["ships"]
+
+    old_results = {key(result): result for result in baseline["results"]}
+    regressions = 0
+    for result in results:
+        old = old_results.get(key(result))
+        if old is None or old["best_s"] <= 0:
+            continue
+        ratio = result["best_s"] / old["best_s"]
+        flag = ""
+        if ratio > REGRESSION_RATIO:
+            flag = "  SLOWER"
+            regressions += 1
+        print("{:<28} {:>2} {}p {:>3} ships  {:>6.2f}x{}".format(
+            result["name"], result["map_size"], result["players"], result["ships"], ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="JSON file to write results to")
+    parser.add_argument("--compare", help="earlier JSON result file to compare against")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--map-sizes", type=int, nargs="+", default=MAP_SIZES)
+    parser.add_argument("--players", type=int, nargs="+", default=PLAYER_COUNTS, choices=PLAYER_COUNTS)
+    parser.add_argument("--ships", type=int, nargs="+", default=FLEET_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run_all(args.map_sizes, args.players, args.ships, args.repeat, args.seed)
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=1)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
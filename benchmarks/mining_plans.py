@@ -0,0 +1,118 @@
+"""
+Compares the halite per turn of hlt.mining plans with MyBot's one step mining rule.
+
+Run from the repository root:
+
+    python -m benchmarks.mining_plans --horizon 6
+
+Every ship of a synthetic game is played alone on the map for horizon turns, once along
+its planned actions and once by MyBot's harvesting rule: stay while the cell has at least
+Parameters.low_halite, else step to a neighbour with more than twice as much. Sweet
+spots are left out, they matter beyond a few turns. Both run under the same extract and
+move cost rules; the table shows the mean halite collected per ship and turn, and how
+long planning the whole fleet took.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from hlt import constants
+from hlt.mining import DIRECTIONS, MiningPlanner
+
+import MyBot
+from .synthetic import SyntheticGame
+
+MAP_SIZES = (32, 48, 64)
+FLEET_SIZES = (10, 50, 100)
+
+
+def _mine(halite, x, y, cargo):
+    extracted = min(-(-halite[x, y] // constants.EXTRACT_RATIO), constants.MAX_HALITE - cargo)
+    halite[x, y] -= extracted
+    return cargo + extracted
+
+
+def play_plan(halite, x, y, cargo, actions):
+    """
+    :param halite: Cell halite indexed [x, y], changed in place
+    :param actions: DIRECTIONS indices of the ship's turns
+    :return: The ship's cargo at the end
+    """
+    width, height = halite.shape
+    for action in actions:
+        cost = halite[x, y] // constants.MOVE_COST_RATIO
+        if action == 0 or cargo < cost:
+            cargo = _mine(halite, x, y, cargo)
+            continue
+        dx, dy = DIRECTIONS[action]
+        cargo -= cost
+        x, y = (x + dx) % width, (y + dy) % height
+    return cargo
+
+
+def play_heuristic(halite, x, y, cargo, turns, low_halite):
+    """
+    :param halite: Cell halite indexed [x, y], changed in place
+    :return: The ship's cargo at the end
+    """
+    width, height = halite.shape
+    for _ in range(turns):
+        best_x, best_y = x, y
+        if halite[x, y] < low_halite:
+            for dx, dy in DIRECTIONS[1:]:
+                cell_x, cell_y = (x + dx) % width, (y + dy) % height
+                if halite[best_x, best_y] < halite[cell_x, cell_y] / 2:
+                    best_x, best_y = cell_x, cell_y
+        cost = halite[x, y] // constants.MOVE_COST_RATIO
+        if (best_x, best_y) == (x, y) or cargo < cost:
+            cargo = _mine(halite, x, y, cargo)
+        else:
+            cargo -= cost
+            x, y = best_x, best_y
+    return cargo
+
+
+def run(map_size, ships, horizon, seed, params=MyBot.DEFAULT_PARAMETERS):
+    """
+    :return: Mean halite per ship and turn of the plans as the planner predicted them, as played, and of
+        the heuristic, and the planning time in seconds
+    """
+    game = SyntheticGame(map_size, 2, ships, seed).game()
+    halite = np.array([[cell.halite_amount for cell in row] for row in game.game_map._cells], dtype=np.int64).T
+    fleet = game.me.get_ships()
+    xs = np.array([ship.position.x for ship in fleet])
+    ys = np.array([ship.position.y for ship in fleet])
+    cargo = np.array([ship.halite_amount for ship in fleet])
+    planner = MiningPlanner(map_size, map_size, horizon)
+    start = time.perf_counter()
+    plan = planner.plan(halite, xs, ys, cargo)
+    elapsed = time.perf_counter() - start
+
+    played = sum(play_plan(halite.copy(), x, y, amount, actions) - amount
+                 for x, y, amount, actions in zip(xs, ys, cargo, plan.actions))
+    heuristic = sum(play_heuristic(halite.copy(), x, y, amount, horizon, params.low_halite) - amount
+                    for x, y, amount in zip(xs, ys, cargo))
+    turns = len(fleet) * horizon
+    return plan.collected.sum() / turns, played / turns, heuristic / turns, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizon", type=int, default=6, help="turns planned")
+    parser.add_argument("--map-sizes", type=int, nargs="+", default=MAP_SIZES)
+    parser.add_argument("--ships", type=int, nargs="+", default=FLEET_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("{:>5} {:>5}  {:>9} {:>9} {:>9}  {:>8}".format("map", "ships", "planned", "played", "heuristic",
+                                                         "plan ms"))
+    for map_size in args.map_sizes:
+        for ships in args.ships:
+            planned, played, heuristic, elapsed = run(map_size, ships, args.horizon, args.seed)
+            print("{:>5} {:>5}  {:>9.1f} {:>9.1f} {:>9.1f}  {:>8.2f}".format(
+                map_size, ships, planned, played, heuristic, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
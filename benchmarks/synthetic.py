@@ -0,0 +1,145 @@
+"""
+Synthetic game states written in the engine's text protocol.
+
+Feeding these lines to hlt through stdin builds the same objects a real game would,
+without running the engine.
+"""
+import contextlib
+import io
+import json
+import random
+import sys
+
+import hlt
+
+CONSTANTS = {
+    "NEW_ENTITY_ENERGY_COST": 1000,
+    "DROPOFF_COST": 4000,
+    "MAX_ENERGY": 1000,
+    "EXTRACT_RATIO": 4,
+    "MOVE_COST_RATIO": 10,
+    "INSPIRATION_ENABLED": True,
+    "INSPIRATION_RADIUS": 4,
+    "INSPIRATION_SHIP_COUNT": 2,
+    "INSPIRED_EXTRACT_RATIO": 4,
+    "INSPIRED_BONUS_MULTIPLIER": 2.0,
+    "INSPIRED_MOVE_COST_RATIO": 10,
+}
+
+
+def cell_halite(generator):
+    """
+    Halite of a cell some way into a game: about a fifth of the cells mined out, a quarter
+    depleted below MyBot's low_halite, the rest a Pareto spread up to MAX_ENERGY.
+    :param generator: A random.Random
+    :return: The amount
+    """
+    draw = generator.random()
+    if draw < 0.2:
+        return 0
+    if draw < 0.45:
+        return generator.randrange(1, 50)
+    return min(1000, int(generator.paretovariate(2.0) * 80))
+
+
+@contextlib.contextmanager
+def feed(lines):
+    """
+    Temporarily replaces stdin with the given lines, so hlt reads them as engine input.
+    :param lines: The lines to read
+    """
+    stdin = sys.stdin
+    sys.stdin = io.StringIO("\n".join(lines) + "\n")
+    try:
+        yield
+    finally:
+        sys.stdin = stdin
+
+
+class SyntheticGame:
+    """
+    A reproducible random game of a given map size, player count and fleet size.
+    """
+    def __init__(self, map_size, num_players, ships_per_player, seed=0, my_id=0):
+        """
+        :param map_size: Width and height of the map
+        :param num_players: 2 or 4
+        :param ships_per_player: Ships each player owns in every frame
+        :param seed: Seed of the random generator
+        :param my_id: The id of the player the bot plays as
+        """
+        self.map_size = map_size
+        self.num_players = num_players
+        self.ships_per_player = ships_per_player
+        self.seed = seed
+        self.my_id = my_id
+        self.max_turns = 25 * (map_size - 32) // 8 + 401
+
+        generator = random.Random(seed)
+        quarter = map_size // 4
+        shipyards = [(quarter, 2 * quarter), (3 * quarter, 2 * quarter)]
+        if num_players == 4:
+            shipyards = [(quarter, quarter), (3 * quarter, quarter),
+                         (quarter, 3 * quarter), (3 * quarter, 3 * quarter)]
+        self.shipyards = shipyards
+
+        # Mirror the left half like the engine does, so players see the same halite
+        halite = [[0] * map_size for _ in range(map_size)]
+        for y in range(map_size):
+            for x in range(map_size // 2):
+                amount = cell_halite(generator)
+                halite[y][x] = amount
+                halite[y][map_size - 1 - x] = amount
+        self.halite = halite
+
+    def init_lines(self):
+        """
+        :return: The lines the engine sends before the first turn
+        """
+        constants = dict(CONSTANTS, MAX_TURNS=self.max_turns)
+        lines = [json.dumps(constants), "{} {}".format(self.num_players, self.my_id)]
+        for player_id, (x, y) in enumerate(self.shipyards):
+            lines.append("{} {} {}".format(player_id, x, y))
+        lines.append("{} {}".format(self.map_size, self.map_size))
+        lines.extend(" ".join(str(amount) for amount in row) for row in self.halite)
+        return lines
+
+    def map_lines(self):
+        """
+        :return: The lines GameMap._generate reads
+        """
+        return self.init_lines()[2 + self.num_players:]
+
+    def frame_lines(self, turn_number):
+        """
+        Ships are placed on distinct random cells, and about two cells per ship change halite,
+        to amounts drawn like the map's.
+        :param turn_number: The turn the frame is for
+        :return: The lines the engine sends at the start of that turn
+        """
+        generator = random.Random(self.seed * 100003 + turn_number)
+        cells = generator.sample(range(self.map_size * self.map_size), self.num_players * self.ships_per_player)
+        lines = [str(turn_number)]
+        for player_id in range(self.num_players):
+            lines.append("{} {} 0 {}".format(player_id, self.ships_per_player, 5000))
+            for index in range(self.ships_per_player):
+                cell = cells[player_id * self.ships_per_player + index]
+                lines.append("{} {} {} {}".format(player_id * 1000 + index, cell % self.map_size,
+                                                  cell // self.map_size, generator.randrange(1001)))
+        changed = 2 * self.num_players * self.ships_per_player
+        lines.append(str(changed))
+        for _ in range(changed):
+            lines.append("{} {} {}".format(generator.randrange(self.map_size), generator.randrange(self.map_size),
+                                           cell_halite(generator)))
+        return lines
+
+    def game(self, turn_number=1):
+        """
+        Builds a game and updates it with the frame of the given turn.
+        :param turn_number: The turn the game is at
+        :return: The hlt.Game object
+        """
+        with feed(self.init_lines() + self.frame_lines(turn_number)):
+            game = hlt.Game(log_level=None)
+            game.update_frame()
+        return game
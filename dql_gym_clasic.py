@@ -1,12 +1,13 @@
 import gym
-import random
-from collections import deque
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
 from tensorflow.keras.optimizers import Adam
 from tqdm import tqdm
 import numpy as np
 
+from rl.dqn import batch_update
+from rl.replay_buffer import ReplayBuffer
+
 episodes = 10000
 episode_length = 400
 
@@ -14,9 +15,9 @@ n_states = 50
 n_actions = 3
 
 class DQNAgent:
-    def __init__(self, env):
+    def __init__(self, env, target_update=0, prioritized=False):
         self.env = env
-        self.memory = deque(maxlen=2000)
+        self.memory = ReplayBuffer(2000, self.env.observation_space.shape, prioritized=prioritized)
         self.gama = 0.95 # discount rate
         self.eps = 0.2 # exploration rate
         self.eps_min = 0.01 # minimum exploration rate
@@ -24,6 +25,13 @@ class DQNAgent:
         self.learning_rate = 0.001
         self.model = self.build_model()
         self.state_space = self.env.observation_space.shape[0]
+        # Copy weights to a separate target network every target_update replays, 0 to bootstrap from model itself
+        self.target_update = target_update
+        self.target_model = None
+        if target_update:
+            self.target_model = self.build_model()
+            self.target_model.set_weights(self.model.get_weights())
+        self.replays = 0
 
     def build_model(self):
         model = Sequential()
@@ -37,7 +45,7 @@ class DQNAgent:
         return model
 
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
 
     def act(self, state):
         if np.random.rand() <= self.eps:
@@ -47,18 +55,15 @@ class DQNAgent:
         return np.argmax(act_values)
 
     def replay(self, batch_size=16):
-        try:
-            mini_batch = random.sample(self.memory, batch_size)
-        except:
+        if len(self.memory) < batch_size:
             return
 
-        for state, action, reward, next_state, done in mini_batch:
-            target = reward
-            if not done:
-                target = reward + self.gama * np.amax(self.model.predict(next_state)[0])
-            target_f = self.model.predict(state)
-            target_f[0][action] = target
-            self.model.fit(state, target_f, epochs=1, verbose=0)
+        batch = self.memory.sample(batch_size)
+        _, td_errors = batch_update(self.model, batch, self.gama, self.target_model)
+        self.memory.update_priorities(batch.indices, td_errors)
+        self.replays += 1
+        if self.target_model is not None and self.replays % self.target_update == 0:
+            self.target_model.set_weights(self.model.get_weights())
 
         self.eps = max(self.eps*self.eps_decay, self.eps_min)
 
@@ -0,0 +1,169 @@
+"""
+Fleet-wide assignment of ships to targets by the Hungarian method, repaired turn to turn.
+
+Needs NumPy, which the rest of hlt does not, so it is imported on its own:
+
+    from hlt.assignment import FleetAssigner
+
+    assigner = FleetAssigner(game_map.width, game_map.height, radius=15)
+    targets = assigner.assign(me.get_ships(), good_spots, game_map)
+
+LinearAssignment solves by shortest augmenting paths on reduced costs (the Jonker-Volgenant
+form of the Hungarian method) and keeps the column prices and matches by key. The next
+call starts from them: rows whose match is still tight keep it, only the others are
+augmented. When a few ships or targets change between turns, that is a few O(columns)
+Dijkstra searches instead of a full O(rows^2 * columns) solve.
+"""
+import numpy as np
+
+# Cost of a pair that must not be matched
+FORBIDDEN = 1e9
+# Reduced costs below this count as zero
+TOLERANCE = 1e-9
+
+
+def toroidal_distances(xs, ys, target_xs, target_ys, width, height):
+    """
+    :return: Manhattan distances with wrap-around from every source to every target, shaped (sources, targets)
+    """
+    dx = np.abs(np.asarray(xs)[:, None] - np.asarray(target_xs)[None, :])
+    dy = np.abs(np.asarray(ys)[:, None] - np.asarray(target_ys)[None, :])
+    return np.minimum(dx, width - dx) + np.minimum(dy, height - dy)
+
+
+class LinearAssignment:
+    """
+    Minimum cost matching of every row to its own column, with at least as many columns as rows.
+    """
+    def __init__(self):
+        # Dual price of every column and column of every row, by key, from the last solve
+        self._prices = {}
+        self._matches = {}
+        self.augmented = 0
+
+    def solve(self, cost, row_keys, column_keys):
+        """
+        :param cost: Array of shape (rows, columns), rows <= columns
+        :param row_keys: Hashable key of every row, stable across calls
+        :param column_keys: Hashable key of every column, stable across calls
+        :return: The column index of every row
+        """
+        cost = np.asarray(cost, dtype=np.float64)
+        rows, columns = cost.shape
+        column_index = {key: index for index, key in enumerate(column_keys)}
+        v = np.array([self._prices.get(key, 0.0) for key in column_keys])
+        col4row = np.array([column_index.get(self._matches.get(key), -1) for key in row_keys], dtype=np.int64)
+        # Two rows can not hold on to one column
+        _, first = np.unique(col4row, return_index=True)
+        duplicate = np.ones(rows, dtype=bool)
+        duplicate[first] = False
+        col4row[duplicate] = -1
+
+        # Restore complementary slackness: free columns are priced 0 and matches must stay tight
+        while True:
+            row4col = np.full(columns, -1, dtype=np.int64)
+            matched = col4row >= 0
+            row4col[col4row[matched]] = np.flatnonzero(matched)
+            v[row4col < 0] = 0.0
+            u = (cost - v).min(axis=1)
+            loose = matched & (cost[np.arange(rows), np.maximum(col4row, 0)] - v[np.maximum(col4row, 0)] - u
+                               > TOLERANCE)
+            if not loose.any():
+                break
+            col4row[loose] = -1
+
+        # Free rows take their cheapest column when it is free, which is already tight
+        for row in np.flatnonzero(col4row < 0):
+            column = int(np.argmin(cost[row] - v))
+            if row4col[column] < 0 and cost[row, column] - v[column] - u[row] <= TOLERANCE:
+                col4row[row] = column
+                row4col[column] = row
+
+        self.augmented = 0
+        for row in np.flatnonzero(col4row < 0):
+            self._augment(cost, u, v, row4col, col4row, row)
+            self.augmented += 1
+
+        self._prices = dict(zip(column_keys, v.tolist()))
+        self._matches = {key: column_keys[column] for key, column in zip(row_keys, col4row.tolist())}
+        return col4row
+
+    @staticmethod
+    def _augment(cost, u, v, row4col, col4row, start):
+        """Matches a free row along the shortest augmenting path and updates the prices."""
+        columns = cost.shape[1]
+        shortest = np.full(columns, np.inf)
+        path = np.full(columns, -1, dtype=np.int64)
+        remaining = np.ones(columns, dtype=bool)
+        scanned_rows = []
+        lowest = 0.0
+        row = start
+        while True:
+            scanned_rows.append(row)
+            reduced = lowest + cost[row] - u[row] - v
+            better = remaining & (reduced < shortest)
+            path[better] = row
+            shortest[better] = reduced[better]
+            column = int(np.argmin(np.where(remaining, shortest, np.inf)))
+            lowest = shortest[column]
+            remaining[column] = False
+            if row4col[column] < 0:
+                break
+            row = row4col[column]
+
+        u[start] += lowest
+        for row in scanned_rows[1:]:
+            u[row] += lowest - shortest[col4row[row]]
+        scanned = ~remaining
+        v[scanned] -= lowest - shortest[scanned]
+
+        sink = column
+        while True:
+            row = path[sink]
+            row4col[sink] = row
+            col4row[row], sink = sink, col4row[row]
+            if row == start:
+                break
+
+
+class FleetAssigner:
+    """
+    Gives every ship its own target, trading distance against target halite.
+
+    Targets farther than radius are out of reach; a ship without a target in reach, or
+    with only worse ones, gets None. That option costs as much as a target at radius.
+    """
+    def __init__(self, width, height, radius=15, halite_weight=0.01):
+        """
+        :param radius: Distance from which targets are out of reach
+        :param halite_weight: Turns of distance one halite on the target is worth
+        """
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.halite_weight = halite_weight
+        self.solver = LinearAssignment()
+
+    def assign(self, ships, targets, game_map):
+        """
+        :param ships: Ships to assign
+        :param targets: Target positions, e.g. MyBot.get_sweet_spots
+        :param game_map: The GameMap, for the targets' halite
+        :return: Dict of the target Position, or None, by ship id
+        """
+        if not ships:
+            return {}
+        count = len(ships)
+        distances = toroidal_distances([ship.position.x for ship in ships], [ship.position.y for ship in ships],
+                                       [target.x for target in targets], [target.y for target in targets],
+                                       self.width, self.height)
+        halite = np.array([game_map[target].halite_amount for target in targets], dtype=np.float64)
+        cost = np.full((count, len(targets) + count), FORBIDDEN)
+        cost[:, :len(targets)] = np.where(distances < self.radius, distances - self.halite_weight * halite,
+                                          FORBIDDEN)
+        # Every ship has its own column for staying unassigned
+        cost[:, len(targets):][np.diag_indices(count)] = self.radius
+        column_keys = [(target.x, target.y) for target in targets] + [("none", ship.id) for ship in ships]
+        columns = self.solver.solve(cost, [ship.id for ship in ships], column_keys)
+        return {ship.id: targets[column] if column < len(targets) else None
+                for ship, column in zip(ships, columns.tolist())}
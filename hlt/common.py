@@ -1,3 +1,6 @@
+from . import log
+
+
 # Placed here to avoid circular imports
 def read_input():
     """
@@ -7,5 +10,5 @@ def read_input():
     try:
         return input()
     except EOFError as eof:
-        logging.shutdown()
+        log.shutdown()
         raise SystemExit(eof)
@@ -0,0 +1,168 @@
+"""
+Dropoff site scoring from a wrapped summed-area table of halite.
+
+Needs NumPy, which the rest of hlt does not, so it is imported on its own:
+
+    from hlt.dropoffs import DropoffPlanner
+
+    planner = DropoffPlanner(game)
+    planner.update(game)  # every turn, after update_frame
+    for position, score in planner.candidates(3):
+        ...
+
+The halite grid is padded by the window radius with wrapped copies of the map, so every
+cell's (2 * radius + 1) square is one rectangle of the padded grid and its sum four
+lookups in the table. The table follows the cells the engine reports as changed by
+adding each change to the entries below and right of it, and is rebuilt when a turn
+changes more cells than that is worth.
+"""
+import numpy as np
+
+from .positionals import Position
+
+
+class DropoffPlanner:
+    """
+    Scores every cell as a dropoff site for the game's own player.
+
+    A site's score is the halite in its square neighbourhood, minus distance_cost per cell
+    of distance to our closest shipyard or dropoff and enemy_cost per enemy ship in the
+    neighbourhood. Sites within min_distance of any shipyard or dropoff, ours or an enemy's,
+    are ruled out, as MyBot's own dropoff rule does.
+    """
+    def __init__(self, game, radius=5, min_distance=10, distance_cost=100, enemy_cost=300, incremental_limit=12):
+        """
+        :param game: The hlt.Game, before its first update_frame or right after one
+        :param radius: Half side of the scored neighbourhood
+        :param min_distance: Distance to every shipyard and dropoff a site must exceed
+        :param distance_cost: Halite a cell of distance to our closest drop point costs
+        :param enemy_cost: Halite an enemy ship in the neighbourhood costs
+        :param incremental_limit: Changed cells from which the table is rebuilt instead of updated
+        """
+        game_map = game.game_map
+        self.width, self.height = game_map.width, game_map.height
+        self.radius = radius
+        self.min_distance = min_distance
+        self.distance_cost = distance_cost
+        self.enemy_cost = enemy_cost
+        self.incremental_limit = incremental_limit
+        self._halite = np.array([[cell.halite_amount for cell in row] for row in game_map._cells], dtype=np.int64).T
+        self._table = self._summed_area(self._halite)
+        xs, ys = np.meshgrid(np.arange(self.width), np.arange(self.height), indexing="ij")
+        self._xs, self._ys = xs, ys
+        self.scores = np.zeros((self.width, self.height))
+
+    def _summed_area(self, grid):
+        """
+        :param grid: Array indexed [x, y]
+        :return: Summed-area table of the grid padded by radius with wrapped copies, with a leading zero row and column
+        """
+        padded = np.pad(grid, self.radius, mode="wrap")
+        table = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=np.int64)
+        table[1:, 1:] = padded.cumsum(axis=0).cumsum(axis=1)
+        return table
+
+    def _window_sums(self, table):
+        """
+        :return: Sum of every cell's (2 * radius + 1) square, indexed [x, y]
+        """
+        side = 2 * self.radius + 1
+        width, height = self.width, self.height
+        return table[side:side + width, side:side + height] - table[:width, side:side + height] \
+            - table[side:side + width, :height] + table[:width, :height]
+
+    def _apply_changes(self, changed):
+        """Adds every changed cell's difference to the table entries covering its padded copies."""
+        padded_width, padded_height = self.width + 2 * self.radius, self.height + 2 * self.radius
+        for x, y, halite in changed:
+            delta = halite - int(self._halite[x, y])
+            self._halite[x, y] = halite
+            if not delta:
+                continue
+            for copy_x in range(x + self.radius - self.width, padded_width, self.width):
+                if copy_x < 0:
+                    continue
+                for copy_y in range(y + self.radius - self.height, padded_height, self.height):
+                    if copy_y >= 0:
+                        self._table[copy_x + 1:, copy_y + 1:] += delta
+
+    def distances(self, positions):
+        """
+        :param positions: Positions to measure from
+        :return: Distance with wrap-around from every cell to the closest of them, indexed [x, y]
+        """
+        closest = np.full((self.width, self.height), self.width + self.height)
+        for position in positions:
+            dx = np.abs(self._xs - position.x)
+            dy = np.abs(self._ys - position.y)
+            closest = np.minimum(closest, np.minimum(dx, self.width - dx) + np.minimum(dy, self.height - dy))
+        return closest
+
+    def update(self, game):
+        """
+        Follows the turn's changed cells and rescores every cell.
+        :param game: The hlt.Game right after update_frame
+        :return: The scores, indexed [x, y]
+        """
+        changed = game.game_map.changed_cells
+        if len(changed) > self.incremental_limit:
+            xs, ys, halite = np.array(changed, dtype=np.int64).T
+            self._halite[xs, ys] = halite
+            self._table = self._summed_area(self._halite)
+        elif changed:
+            self._apply_changes(changed)
+
+        own, enemy = [], []
+        enemy_ships = np.zeros((self.width, self.height), dtype=np.int64)
+        for player_id, player in game.players.items():
+            structures = [player.shipyard.position] + [dropoff.position for dropoff in player.get_dropoffs()]
+            if player_id == game.my_id:
+                own += structures
+                continue
+            enemy += structures
+            for ship in player.get_ships():
+                enemy_ships[ship.position.x, ship.position.y] += 1
+
+        home_distances = self.distances(own)
+        scores = self._window_sums(self._table) - self.distance_cost * home_distances \
+            - self.enemy_cost * self._window_sums(self._summed_area(enemy_ships))
+        too_close = home_distances <= self.min_distance
+        if enemy:
+            too_close |= self.distances(enemy) <= self.min_distance
+        self.scores = np.where(too_close, -np.inf, scores)
+        return self.scores
+
+    def window_halite(self):
+        """
+        :return: Halite in every cell's square neighbourhood, indexed [x, y]
+        """
+        return self._window_sums(self._table)
+
+    def candidates(self, count=3):
+        """
+        The best sites, each farther than radius from the better ones.
+        :param count: Sites to return at most
+        :return: List of (Position, score), best first
+        """
+        order = np.argsort(self.scores, axis=None)[::-1]
+        sites = []
+        for index in order.tolist():
+            x, y = divmod(index, self.height)
+            score = self.scores[x, y]
+            if len(sites) == count or score == -np.inf:
+                break
+            if all(self._distance(x, y, site) > self.radius for site, _ in sites):
+                sites.append((Position(x, y), float(score)))
+        return sites
+
+    def is_good_site(self, position, ratio=0.8):
+        """
+        :return: Whether a position scores at least ratio of the best site
+        """
+        best = self.scores.max()
+        score = self.scores[position.x, position.y]
+        return best > 0 and score > -np.inf and score >= ratio * best
+
+    def _distance(self, x, y, position):
+        dx, dy = abs(x - position.x), abs(y - position.y)
+        return min(dx, self.width - dx) + min(dy, self.height - dy)
@@ -0,0 +1,107 @@
+"""
+Map observations for learned policies, built in place from array-backed map state.
+
+Needs NumPy, which the rest of hlt does not, so it is imported on its own:
+
+    from hlt.features import FeatureBuilder
+
+For per-ship policies, EgocentricCrops cuts every ship's wrapped neighbourhood out of
+the tensor at once:
+
+    crops = EgocentricCrops(game_map.width, game_map.height, 15)
+    views = crops.gather(builder.build(game), xs, ys)
+"""
+import numpy as np
+
+
+class FeatureBuilder:
+    """
+    Writes each turn's observation into one preallocated (width, height, channels) tensor,
+    indexed [x, y, channel] like the map.
+
+    Channel 0 is the cell halite. Each player then has three channels: a 1 where it has a
+    ship, the ship's cargo, and a 1 where it has a shipyard or dropoff. The builder's own
+    player comes first, the others follow in id order. With frames > 1 the previous turns'
+    channels follow the current ones, newest first.
+
+    The halite grid is read from the map once and afterwards kept up to date from the cells
+    the engine reports as changed, so build must be called every turn.
+    """
+    def __init__(self, game, dtype=np.float32, frames=1):
+        """
+        :param game: The hlt.Game, before its first update_frame or right after one
+        :param dtype: Type of the tensor, e.g. np.uint16 to keep halite counts exact in half the memory
+        :param frames: Turns stacked in the tensor
+        """
+        self.player_ids = [game.my_id] + sorted(player_id for player_id in game.players if player_id != game.my_id)
+        self.channels = 1 + 3 * len(self.player_ids)
+        self.frames = frames
+        game_map = game.game_map
+        self._halite = np.array([[cell.halite_amount for cell in row] for row in game_map._cells], dtype=np.int32).T
+        self.features = np.zeros((game_map.width, game_map.height, self.channels * frames), dtype=dtype)
+
+    def build(self, game):
+        """
+        Writes the current turn into the tensor, shifting older frames back.
+        :param game: The hlt.Game right after update_frame
+        :return: The tensor, reused and overwritten by the next call
+        """
+        changed = game.game_map.changed_cells
+        if changed:
+            xs, ys, halite = np.array(changed, dtype=np.int32).T
+            self._halite[xs, ys] = halite
+
+        features = self.features
+        if self.frames > 1:
+            features[:, :, self.channels:] = features[:, :, :-self.channels]
+        current = features[:, :, :self.channels]
+        current.fill(0)
+        current[:, :, 0] = self._halite
+
+        xs, ys, channels, values = [], [], [], []
+        for index, player_id in enumerate(self.player_ids):
+            player = game.players[player_id]
+            ship_channel = 1 + 3 * index
+            for ship in player.get_ships():
+                xs += (ship.position.x, ship.position.x)
+                ys += (ship.position.y, ship.position.y)
+                channels += (ship_channel, ship_channel + 1)
+                values += (1, ship.halite_amount)
+            for structure in [player.shipyard] + player.get_dropoffs():
+                xs.append(structure.position.x)
+                ys.append(structure.position.y)
+                channels.append(ship_channel + 2)
+                values.append(1)
+        current[xs, ys, channels] = values
+        return features
+
+
+class EgocentricCrops:
+    """
+    Cuts a size x size window of a feature tensor around every ship in one gather, wrapping
+    around the map edges. Row and column indices of every window are precomputed, so a turn
+    only looks them up by ship position.
+    """
+    def __init__(self, width, height, size):
+        """
+        :param width: Map width
+        :param height: Map height
+        :param size: Window side, the ship sits at index size // 2 of both axes
+        """
+        self.size = size
+        offsets = np.arange(size) - size // 2
+        # Flat index of row x (column y) of every window, by window centre
+        self._rows = (np.arange(width)[:, None] + offsets) % width * height
+        self._columns = (np.arange(height)[:, None] + offsets) % height
+
+    def gather(self, features, xs, ys, out=None):
+        """
+        :param features: Tensor indexed [x, y, channel]
+        :param xs: Ship x coordinates
+        :param ys: Ship y coordinates
+        :param out: Array of shape (ships, size, size, channels) to write into, None for a new one
+        :return: The windows, shaped (ships, size, size, channels)
+        """
+        indices = self._rows[xs][:, :, None] + self._columns[ys][:, None, :]
+        flat = features.reshape(-1, features.shape[-1])
+        return np.take(flat, indices, axis=0, out=out)
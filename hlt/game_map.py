@@ -145,6 +145,8 @@ class GameMap:
         self.width = width
         self.height = height
         self._cells = cells
+        # (x, y, halite) of the cells the last update changed, for incremental consumers like FeatureBuilder
+        self.changed_cells = []
 
     def __getitem__(self, location):
         """
@@ -263,6 +265,8 @@ class GameMap:
             for x in range(self.width):
                 self[Position(x, y)].ship = None
 
+        self.changed_cells = []
         for _ in range(int(read_input())):
             cell_x, cell_y, cell_energy = map(int, read_input().split())
             self[Position(cell_x, cell_y)].halite_amount = cell_energy
+            self.changed_cells.append((cell_x, cell_y, cell_energy))
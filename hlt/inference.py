@@ -0,0 +1,116 @@
+"""
+Forward passes of exported Keras models in plain NumPy.
+
+Bots load a model written by rl/export.py instead of importing TensorFlow, which takes
+seconds and hundreds of MB before the first turn:
+
+    from hlt.inference import Network
+    network = Network.load("policy.npz")
+    q_values = network.predict_on_batch(views)
+
+Supports the layers our models use: dense, conv2d (valid, zero "same" or circular padding),
+flatten, with linear or relu activations.
+"""
+import json
+
+import numpy as np
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+}
+
+
+def dense(x, kernel, bias=None):
+    """
+    :param x: Input of shape (batch, features)
+    :param kernel: Weights of shape (features, units)
+    :return: Output of shape (batch, units)
+    """
+    y = x @ kernel
+    if bias is not None:
+        y += bias
+    return y
+
+
+def conv2d(x, kernel, bias=None, strides=(1, 1), padding="valid"):
+    """
+    Channels-last 2D convolution (cross-correlation, as in Keras) as one tensordot over strided windows.
+    :param x: Input of shape (batch, rows, columns, channels)
+    :param kernel: Weights of shape (kernel rows, kernel columns, channels, filters)
+    :param strides: Step between windows along rows and columns
+    :param padding: "valid", "same" to pad with zeros, or "circular" to wrap around the edges like the map
+    :return: Output of shape (batch, output rows, output columns, filters)
+    """
+    kernel_rows, kernel_columns = kernel.shape[:2]
+    if padding != "valid":
+        # As Keras: enough for ceil(size / stride) windows, the odd cell goes after
+        pad_width = [(0, 0)]
+        for size, kernel_size, stride in zip(x.shape[1:3], (kernel_rows, kernel_columns), strides):
+            total = max((-(-size // stride) - 1) * stride + kernel_size - size, 0)
+            pad_width.append((total // 2, total - total // 2))
+        pad_width.append((0, 0))
+        x = np.pad(x, pad_width, mode="wrap" if padding == "circular" else "constant")
+    batch, rows, columns, channels = x.shape
+    windows = np.lib.stride_tricks.as_strided(
+        x, shape=(batch, rows - kernel_rows + 1, columns - kernel_columns + 1, kernel_rows, kernel_columns, channels),
+        strides=x.strides[:3] + x.strides[1:], writeable=False)
+    windows = windows[:, ::strides[0], ::strides[1]]
+    y = np.tensordot(windows, kernel, axes=3)
+    if bias is not None:
+        y += bias
+    return y
+
+
+def flatten(x):
+    """
+    :return: x with everything after the batch axis in one axis, in Keras' channels-last order
+    """
+    return x.reshape(len(x), -1)
+
+
+class Network:
+    """
+    A sequential model as a list of layer configs and their weights.
+    """
+    def __init__(self, layers, weights):
+        """
+        :param layers: Layer configs, dicts with "type" and the layer's options
+        :param weights: Per layer, the list of its weight arrays
+        """
+        for layer in layers:
+            if layer["type"] not in ("dense", "conv2d", "flatten"):
+                raise ValueError("Unsupported layer type {}".format(layer["type"]))
+            if layer.get("activation", "linear") not in ACTIVATIONS:
+                raise ValueError("Unsupported activation {}".format(layer["activation"]))
+        self.layers = layers
+        self.weights = weights
+
+    @staticmethod
+    def load(path):
+        """
+        :param path: An .npz file written by rl/export.py
+        :return: The Network
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            layers = json.loads(str(archive["layers"]))
+            weights = [[archive["{}_{}".format(index, number)] for number in range(layer.get("weights", 0))]
+                       for index, layer in enumerate(layers)]
+        return Network(layers, weights)
+
+    def predict_on_batch(self, x):
+        """
+        :param x: Input batch
+        :return: The model's output for it
+        """
+        x = np.asarray(x, dtype=np.float32)
+        for layer, weights in zip(self.layers, self.weights):
+            if layer["type"] == "dense":
+                x = dense(x, *weights)
+            elif layer["type"] == "conv2d":
+                x = conv2d(x, *weights, strides=tuple(layer.get("strides", (1, 1))),
+                           padding=layer.get("padding", "valid"))
+            else:
+                x = flatten(x)
+            x = ACTIVATIONS[layer.get("activation", "linear")](x)
+        return x
@@ -0,0 +1,161 @@
+"""
+Logging set up for bots: records are queued to a background writer thread and formatted
+there, so neither string formatting nor file I/O happens inside the turn loop.
+
+Log with lazy arguments to benefit from it, i.e. logging.info("Moves: %s", moves)
+instead of logging.info("Moves: {}".format(moves)).
+"""
+import atexit
+import collections
+import logging
+import logging.handlers
+import queue
+import sys
+
+_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+_turn_number = 0
+_listener = None
+_ring = None
+_crash_filename = None
+_previous_excepthook = None
+
+
+class _TurnFilter(logging.Filter):
+    """Stamps records with the turn they were logged in."""
+    def filter(self, record):
+        record.turn = _turn_number
+        return True
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the writer thread.
+    Mutable arguments are shallow copied so they are formatted as they were when logged.
+    """
+    def prepare(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(arg.copy() if isinstance(arg, (list, dict, set)) else arg
+                                for arg in record.args)
+        return record
+
+
+class TurnRingHandler(logging.Handler):
+    """
+    Keeps the records of the last few turns in memory, to be dumped when the bot crashes.
+    """
+    def __init__(self, turns, level=logging.NOTSET):
+        """
+        :param turns: How many turns of records to keep
+        :param level: The lowest level of records to keep
+        """
+        super().__init__(level)
+        self._turns = collections.deque(maxlen=turns)
+        self._last_turn = None
+
+    def emit(self, record):
+        turn = getattr(record, "turn", None)
+        if turn != self._last_turn or not self._turns:
+            self._turns.append([])
+            self._last_turn = turn
+        self._turns[-1].append(record)
+
+    def dump(self, filename):
+        """
+        Writes all kept records to a file.
+        :param filename: The file to write to
+        :return: nothing.
+        """
+        formatter = self.formatter or logging.Formatter(_FORMAT)
+        with open(filename, "w") as dump_file:
+            for records in self._turns:
+                for record in records:
+                    dump_file.write(formatter.format(record) + "\n")
+
+
+def setup(filename, level=logging.DEBUG, ring_turns=0, ring_level=None, crash_filename=None):
+    """
+    Routes the root logger through a background writer thread.
+    :param filename: The log file, or None to not write one
+    :param level: The lowest level written to the log file
+    :param ring_turns: How many turns of records to keep in memory, 0 to keep none
+    :param ring_level: The lowest level kept in memory, defaults to level
+    :param crash_filename: Where the kept records are dumped on an uncaught exception
+    :return: nothing.
+    """
+    global _listener, _ring, _crash_filename, _previous_excepthook
+    shutdown_listener()
+
+    handlers = []
+    levels = []
+    if filename is not None:
+        file_handler = logging.FileHandler(filename, mode="w")
+        file_handler.setLevel(level)
+        file_handler.setFormatter(logging.Formatter(_FORMAT))
+        handlers.append(file_handler)
+        levels.append(level)
+
+    _ring = None
+    if ring_turns > 0:
+        ring_level = level if ring_level is None else ring_level
+        _ring = TurnRingHandler(ring_turns, ring_level)
+        handlers.append(_ring)
+        levels.append(ring_level)
+    _crash_filename = crash_filename
+
+    queue_handler = _LazyQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(_TurnFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # Nothing below the lowest enabled level even builds a record
+    root.setLevel(min(levels) if levels else logging.CRITICAL + 1)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    if _previous_excepthook is None:
+        _previous_excepthook = sys.excepthook
+        sys.excepthook = _excepthook
+        atexit.register(shutdown_listener)
+
+
+def set_turn(turn_number):
+    """
+    Sets the turn number stamped on records logged from now on.
+    :param turn_number: The current turn number
+    :return: nothing.
+    """
+    global _turn_number
+    _turn_number = turn_number
+
+
+def shutdown_listener():
+    """
+    Stops the writer thread after it wrote out all queued records.
+    :return: nothing.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def shutdown():
+    """
+    Writes out all queued records and shuts logging down.
+    :return: nothing.
+    """
+    shutdown_listener()
+    logging.shutdown()
+
+
+def _excepthook(exc_type, exc_value, exc_traceback):
+    """Logs the uncaught exception and dumps the records kept in memory."""
+    logging.critical("Uncaught exception", exc_info=(exc_type, exc_value, exc_traceback))
+    shutdown_listener()
+    if _ring is not None and _crash_filename is not None:
+        _ring.dump(_crash_filename)
+    _previous_excepthook(exc_type, exc_value, exc_traceback)
@@ -0,0 +1,124 @@
+"""
+Multi-turn mining plans for the whole fleet, by dynamic programming over a local window.
+
+Needs NumPy, which the rest of hlt does not, so it is imported on its own:
+
+    from hlt.mining import DIRECTIONS, MiningPlanner
+
+    planner = MiningPlanner(game_map.width, game_map.height, horizon=6)
+    plan = planner.plan(halite, xs, ys, cargo)
+    move = DIRECTIONS[plan.actions[index, 0]]
+
+A plan is a sequence of stays and moves that maximizes the ship's cargo after horizon
+turns, under the engine's rules. Mining takes 1/EXTRACT_RATIO of the cell rounded up, up
+to the free hold. Moving costs 1/MOVE_COST_RATIO of the cell left, rounded down, and a
+ship that cannot pay stays. Other ships, inspiration and cells visited twice in a plan
+are not modelled.
+
+More cargo never hurts under these rules: both mining and paying for moves keep the
+order of two cargo amounts. So the best cargo reaching a (turn, cell) dominates every
+smaller one, and the table keeps only that instead of one entry per cargo bucket.
+"""
+import collections
+
+import numpy as np
+
+from . import constants
+from .features import EgocentricCrops
+from .positionals import Direction
+
+# Plan actions by index, in rl.augment.ACTIONS order
+DIRECTIONS = (Direction.Still, Direction.North, Direction.South, Direction.East, Direction.West)
+
+MiningPlan = collections.namedtuple("MiningPlan", "actions collected")
+
+UNREACHABLE = -1
+
+
+class MiningPlanner:
+    """
+    Plans horizon turns of every ship at once, within the window the ship can reach.
+    """
+    def __init__(self, width, height, horizon=6):
+        """
+        :param width: Map width
+        :param height: Map height
+        :param horizon: Turns planned
+        """
+        self.horizon = horizon
+        self.size = 2 * horizon + 1
+        self._crops = EgocentricCrops(width, height, self.size)
+
+    def plan(self, halite, xs, ys, cargo):
+        """
+        :param halite: Cell halite indexed [x, y], e.g. channel 0 of a FeatureBuilder tensor
+        :param xs: Ship x coordinates
+        :param ys: Ship y coordinates
+        :param cargo: Ship cargo
+        :return: MiningPlan of the DIRECTIONS index of every ship's action per turn, shaped
+            (ships, horizon), and the halite each plan collects net of move costs
+        """
+        horizon, size = self.horizon, self.size
+        count = len(xs)
+        if not count:
+            return MiningPlan(np.zeros((0, horizon), dtype=np.int8), np.zeros(0, dtype=np.int64))
+        windows = self._crops.gather(np.asarray(halite)[:, :, None], xs, ys)[..., 0].astype(np.int32)
+        cargo = np.asarray(cargo, dtype=np.int32)
+
+        # Best cargo on every cell after `stays` turns there, by [stays, ship, x, y], and the cell's halite.
+        # Cells reached by turn t lie within distance t of the centre, so the arrays cover just that box.
+        carried = np.full((1, count, 1, 1), UNREACHABLE, dtype=np.int32)
+        carried[0, :, 0, 0] = cargo
+        cells = windows[None, :, horizon:horizon + 1, horizon:horizon + 1].copy()
+        # Where the best arrival on a window cell came from, by [turn, ship, x, y]: the move's
+        # DIRECTIONS index - 1 plus 4 times the turns stayed before it
+        sources = np.zeros((horizon + 1, count, size, size), dtype=np.int32)
+        # Moves are compared by keys ordering them by cargo first, so one max also keeps the source
+        pointers = 4 * (horizon + 1)
+        stays = 4 * np.arange(horizon + 1, dtype=np.int32)[:, None, None, None]
+
+        for turn in range(horizon):
+            reachable = carried != UNREACHABLE
+            cost = cells // constants.MOVE_COST_RATIO
+            leaving = np.where(reachable & (carried >= cost), carried - cost, UNREACHABLE)
+            # Padded by 2, so each cell of the next turn's one larger box finds all four neighbours
+            span = 2 * turn + 3
+            padded = np.full((count, span + 2, span + 2), UNREACHABLE * pointers, dtype=np.int32)
+            padded[:, 2:-2, 2:-2] = (leaving * pointers + stays[:turn + 1]).max(axis=0)
+            keys = None
+            for index, (dx, dy) in enumerate(DIRECTIONS[1:]):
+                moved = padded[:, 1 - dx:1 - dx + span, 1 - dy:1 - dy + span] + index
+                keys = moved if keys is None else np.maximum(keys, moved)
+
+            extracted = np.minimum(-(-cells // constants.EXTRACT_RATIO), constants.MAX_HALITE - carried)
+            extracted[~reachable] = 0
+            # Staying shifts every entry to one more stay, the moves arrive with none
+            next_carried = np.full((turn + 2, count, span, span), UNREACHABLE, dtype=np.int32)
+            next_carried[1:, :, 1:-1, 1:-1] = np.where(reachable, carried + extracted, UNREACHABLE)
+            next_carried[0] = np.where(keys >= 0, keys // pointers, UNREACHABLE)
+            target = slice(horizon - turn - 1, horizon + turn + 2)
+            next_cells = np.empty_like(next_carried)
+            next_cells[1:, :, 1:-1, 1:-1] = cells - extracted
+            next_cells[0] = windows[:, target, target]
+            sources[turn + 1, :, target, target] = keys % pointers
+            carried, cells = next_carried, next_cells
+
+        final = carried.transpose(1, 0, 2, 3).reshape(count, -1)
+        best = final.argmax(axis=1)
+        ships = np.arange(count)
+        # Walk every plan back from its end at once; stays are the zeros actions start with
+        actions = np.zeros((count, horizon), dtype=np.int8)
+        last_stays, x, y = np.unravel_index(best, (horizon + 1, size, size))
+        turn = horizon - last_stays
+        offsets = np.array(DIRECTIONS)
+        for _ in range(horizon):
+            moving = turn > 0
+            if not moving.any():
+                break
+            source = sources[turn[moving], ships[moving], x[moving], y[moving]]
+            direction = source % 4 + 1
+            actions[ships[moving], turn[moving] - 1] = direction
+            x[moving] -= offsets[direction, 0]
+            y[moving] -= offsets[direction, 1]
+            turn[moving] -= 1 + source // 4
+        return MiningPlan(actions, final[ships, best].astype(np.int64) - cargo)
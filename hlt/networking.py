@@ -1,22 +1,36 @@
 import json
 import logging
+import os
 import sys
+import time
 
 from .common import read_input
-from . import constants
+from . import constants, log
+from .profiling import StackSampler, profiler
 from .game_map import GameMap, Player
 
+# Environment variable naming the directory bot log files are written to
+LOG_DIR_VARIABLE = "HLT_LOG_DIR"
+
 
 class Game:
     """
     The game object holds all metadata pertinent to the game and all its contents
     """
-    def __init__(self):
+    def __init__(self, log_level=logging.DEBUG, log_ring_turns=0, log_ring_level=None, profile=False,
+                 sample_every=0, sample_threshold=None):
         """
         Initiates a game object collecting all start-state instances for the contained items for pre-game.
-        Also sets up basic logging.
+        Also sets up logging, written to the log file by a background thread.
+        :param log_level: The lowest level written to bot-{id}.log, None to not write the file
+        :param log_ring_turns: How many turns of records to keep in memory and dump to bot-{id}-crash.log on a crash
+        :param log_ring_level: The lowest level kept in memory, defaults to log_level
+        :param profile: Whether to write per-turn timings and call counts to bot-{id}-timing.jsonl
+        :param sample_every: Write sampled stacks of every Nth turn to bot-{id}-turn-{turn}.folded, 0 to not
+        :param sample_threshold: Also write sampled stacks of turns slower than this many seconds, None to not
         """
         self.turn_number = 0
+        self.turn_start = time.perf_counter()
 
         # Grab constants JSON
         raw_constants = read_input()
@@ -24,10 +38,14 @@ class Game:
 
         num_players, self.my_id = map(int, read_input().split())
 
-        logging.basicConfig(
-            filename="bot-{}.log".format(self.my_id),
-            filemode="w",
-            level=logging.DEBUG,
+        # Log files go to $HLT_LOG_DIR when set, e.g. by tournament.py to keep concurrent games apart
+        log_dir = os.environ.get(LOG_DIR_VARIABLE, "")
+        log.setup(
+            filename=None if log_level is None else os.path.join(log_dir, "bot-{}.log".format(self.my_id)),
+            level=logging.DEBUG if log_level is None else log_level,
+            ring_turns=log_ring_turns,
+            ring_level=log_ring_level,
+            crash_filename=os.path.join(log_dir, "bot-{}-crash.log".format(self.my_id)),
         )
 
         self.players = {}
@@ -36,6 +54,17 @@ class Game:
         self.me = self.players[self.my_id]
         self.game_map = GameMap._generate()
 
+        self.profiler = profiler
+        if profile:
+            self.profiler.start(os.path.join(log_dir, "bot-{}-timing.jsonl".format(self.my_id)))
+            for function_name in ("calculate_distance", "normalize", "naive_navigate"):
+                self.profiler.instrument(GameMap, function_name)
+
+        self.sampler = None
+        if sample_every or sample_threshold is not None:
+            self.sampler = StackSampler(os.path.join(log_dir, "bot-" + str(self.my_id) + "-turn-{:03}.folded"),
+                                        every=sample_every, threshold=sample_threshold)
+
     def ready(self, name):
         """
         Indicate that your bot is ready to play.
@@ -48,32 +77,42 @@ class Game:
         Updates the game object's state.
         :returns: nothing.
         """
+        # The turn starts once the engine sends it, not while waiting for it
         self.turn_number = int(read_input())
-        logging.info("=============== TURN {:03} ================".format(self.turn_number))
-
-        for _ in range(len(self.players)):
-            player, num_ships, num_dropoffs, halite = map(int, read_input().split())
-            self.players[player]._update(num_ships, num_dropoffs, halite)
-
-        self.game_map._update()
-
-        # Mark cells with ships as unsafe for navigation
-        for player in self.players.values():
-            for ship in player.get_ships():
-                self.game_map[ship.position].mark_unsafe(ship)
-
-            self.game_map[player.shipyard.position].structure = player.shipyard
-            for dropoff in player.get_dropoffs():
-                self.game_map[dropoff.position].structure = dropoff
-
-    @staticmethod
-    def end_turn(commands):
+        self.turn_start = time.perf_counter()
+        self.profiler.start_turn()
+        if self.sampler is not None:
+            self.sampler.start_turn(self.turn_number)
+        with self.profiler.scope("update_frame"):
+            log.set_turn(self.turn_number)
+            logging.info("=============== TURN %03d ================", self.turn_number)
+
+            for _ in range(len(self.players)):
+                player, num_ships, num_dropoffs, halite = map(int, read_input().split())
+                self.players[player]._update(num_ships, num_dropoffs, halite)
+
+            self.game_map._update()
+
+            # Mark cells with ships as unsafe for navigation
+            for player in self.players.values():
+                for ship in player.get_ships():
+                    self.game_map[ship.position].mark_unsafe(ship)
+
+                self.game_map[player.shipyard.position].structure = player.shipyard
+                for dropoff in player.get_dropoffs():
+                    self.game_map[dropoff.position].structure = dropoff
+
+    def end_turn(self, commands):
         """
         Method to send all commands to the game engine, effectively ending your turn.
         :param commands: Array of commands to send to engine
         :return: nothing.
         """
-        send_commands(commands)
+        with self.profiler.scope("end_turn"):
+            send_commands(commands)
+        self.profiler.end_turn(self.turn_number)
+        if self.sampler is not None:
+            self.sampler.end_turn(self.turn_number)
 
 
 def send_commands(commands):
@@ -0,0 +1,212 @@
+"""
+Cooperative multi-turn paths for the fleet (windowed hierarchical cooperative A*, WHCA*).
+
+Every planned ship reserves the cells it will stand on in the next turns in one shared
+(cell, turn) table, and later ships search around those reservations. The table and
+paths outlive the turn: a ship keeps following its path while it is where the path says,
+its goal is unchanged and the path still reaches far enough, so a turn only replans the
+ships whose reservations were invalidated.
+
+    planner = CooperativePlanner(game_map.width, game_map.height)
+    moves = planner.plan(game.turn_number, ships, goals, blocked)
+
+Ships only collide where they end a turn, two ships passing each other are safe, so
+only cells are reserved and not the moves between them.
+
+Blocked cells, those of ships the planner does not move, count as taken for blocked_turns
+turns and not just the next one. Otherwise staying a turn and then moving through a ship
+that never leaves always looks cheaper than going around it, and the path is replanned
+the same way every turn while the ship waits.
+"""
+import heapq
+
+from . import constants
+from .positionals import Direction
+
+# Moves tried from every cell, staying last so ties prefer progress
+MOVES = (Direction.North, Direction.South, Direction.East, Direction.West, Direction.Still)
+
+
+class ReservationTable:
+    """
+    Which ship stands on a cell at a turn, by absolute turn number.
+    """
+    def __init__(self):
+        self._turns = {}
+
+    def holder(self, cell, turn):
+        """
+        :param cell: (x, y)
+        :return: The id of the ship holding the cell at that turn, or None
+        """
+        return self._turns.get(turn, {}).get(cell)
+
+    def reserve(self, cell, turn, ship_id):
+        """
+        :return: The id of the ship that held the cell before, or None
+        """
+        cells = self._turns.setdefault(turn, {})
+        previous = cells.get(cell)
+        cells[cell] = ship_id
+        return previous
+
+    def release(self, cells, first_turn, ship_id):
+        """
+        Releases a path's cells that are still held by its ship.
+        :param cells: Cells of consecutive turns
+        :param first_turn: Turn of the first cell
+        :return: nothing.
+        """
+        for offset, cell in enumerate(cells):
+            reserved = self._turns.get(first_turn + offset)
+            if reserved is not None and reserved.get(cell) == ship_id:
+                del reserved[cell]
+
+    def prune(self, turn):
+        """
+        Forgets the turns before the given one.
+        :return: nothing.
+        """
+        for old_turn in [old_turn for old_turn in self._turns if old_turn < turn]:
+            del self._turns[old_turn]
+
+
+class CooperativePlanner:
+    """
+    Plans collision free paths of up to window turns for ships with goals, keeping them across turns.
+    """
+    def __init__(self, width, height, window=8, max_replans=None, blocked_turns=None):
+        """
+        :param window: Turns every search looks ahead
+        :param max_replans: Searches per turn at most; ships over it stay, None for no limit
+        :param blocked_turns: Turns blocked cells stay taken in a search, None for the whole window
+        """
+        self.width = width
+        self.height = height
+        self.window = window
+        self.max_replans = max_replans
+        self.blocked_turns = window if blocked_turns is None else blocked_turns
+        self.table = ReservationTable()
+        # (goal, first turn, cells by turn) of every planned ship
+        self._paths = {}
+        self.replanned = 0
+
+    def distance(self, source, target):
+        """
+        :return: Manhattan distance with wrap-around between two (x, y) cells
+        """
+        dx, dy = abs(source[0] - target[0]), abs(source[1] - target[1])
+        return min(dx, self.width - dx) + min(dy, self.height - dy)
+
+    def plan(self, turn, ships, goals, blocked=(), game_map=None):
+        """
+        :param turn: The current turn number
+        :param ships: Ships to move, the first ones get their paths first when several are replanned
+        :param goals: (x, y) goal of every ship id
+        :param blocked: (x, y) cells none of the ships may enter in the next blocked_turns turns, e.g. those of
+            other ships
+        :param game_map: The GameMap, to keep ships that cannot pay for moving still; None to ignore move costs
+        :return: The Direction of every ship for this turn
+        """
+        self.table.prune(turn)
+        ship_ids = {ship.id for ship in ships}
+        for ship_id in [ship_id for ship_id in self._paths if ship_id not in ship_ids]:
+            self._forget(ship_id)
+
+        blocked = set(blocked)
+        queue = []
+        for ship in ships:
+            position = (ship.position.x, ship.position.y)
+            if not self._follows(ship.id, position, goals[ship.id], turn, blocked):
+                self._forget(ship.id)
+                queue.append(ship)
+
+        self.replanned = 0
+        attempts = {}
+        while queue:
+            ship = queue.pop(0)
+            position = (ship.position.x, ship.position.y)
+            attempts[ship.id] = attempts.get(ship.id, 0) + 1
+            stuck = game_map is not None and \
+                ship.halite_amount < game_map[ship.position].halite_amount // constants.MOVE_COST_RATIO
+            cells = None
+            if self.max_replans is None or self.replanned < self.max_replans:
+                self.replanned += 1
+                cells = self._search(ship.id, position, goals[ship.id], turn, blocked, stuck)
+            if cells is None:
+                # No way around the reservations: stay, and take the cell from whoever planned to come
+                cells = [position, position]
+                evicted = self.table.holder(position, turn + 1)
+                if evicted is not None and evicted != ship.id and attempts.get(evicted, 0) < 2:
+                    evicted_ship = next(other for other in ships if other.id == evicted)
+                    self._forget(evicted)
+                    queue.append(evicted_ship)
+            for offset, cell in enumerate(cells):
+                self.table.reserve(cell, turn + offset, ship.id)
+            self._paths[ship.id] = (goals[ship.id], turn, cells)
+
+        moves = {}
+        for ship in ships:
+            _, first_turn, cells = self._paths[ship.id]
+            (x, y), (next_x, next_y) = cells[turn - first_turn], cells[turn - first_turn + 1]
+            dx, dy = (next_x - x + 1) % self.width - 1, (next_y - y + 1) % self.height - 1
+            moves[ship.id] = (dx, dy)
+        return moves
+
+    def _follows(self, ship_id, position, goal, turn, blocked):
+        """Whether a ship can keep its path: on it, same goal, far enough ahead and not through blocked cells."""
+        path = self._paths.get(ship_id)
+        if path is None:
+            return False
+        path_goal, first_turn, cells = path
+        offset = turn - first_turn
+        if path_goal != goal or offset + 1 >= len(cells) or cells[offset] != position:
+            return False
+        if cells[-1] != goal and len(cells) - offset <= self.window // 2:
+            return False
+        ahead = cells[offset + 1:offset + 1 + self.blocked_turns]
+        return not any(cell in blocked and cell != position for cell in ahead)
+
+    def _forget(self, ship_id):
+        path = self._paths.pop(ship_id, None)
+        if path is not None:
+            _, first_turn, cells = path
+            self.table.release(cells, first_turn, ship_id)
+
+    def _search(self, ship_id, start, goal, turn, blocked, stuck):
+        """
+        Space-time A* from start until the goal or the window's end, around other ships' reservations.
+        :return: Cells of the path from this turn on, or None if the ship can not even stay
+        """
+        width, height, window = self.width, self.height, self.window
+        table = self.table
+        # Entries (f, -depth, order, cell, depth), deeper first on ties
+        frontier = [(self.distance(start, goal), 0, 0, start, 0)]
+        parents = {(start, 0): None}
+        order = 0
+        while frontier:
+            _, _, _, cell, depth = heapq.heappop(frontier)
+            if (cell == goal and depth) or depth == window:
+                cells = []
+                node = (cell, depth)
+                while node is not None:
+                    cells.append(node[0])
+                    node = parents[node]
+                cells.reverse()
+                return cells if len(cells) > 1 else None
+            moves = (Direction.Still,) if stuck and depth == 0 else MOVES
+            for dx, dy in moves:
+                neighbour = ((cell[0] + dx) % width, (cell[1] + dy) % height)
+                node = (neighbour, depth + 1)
+                if node in parents:
+                    continue
+                if depth < self.blocked_turns and neighbour != start and neighbour in blocked:
+                    continue
+                holder = table.holder(neighbour, turn + depth + 1)
+                if holder is not None and holder != ship_id:
+                    continue
+                parents[node] = (cell, depth)
+                order += 1
+                heapq.heappush(frontier, (depth + 1 + self.distance(neighbour, goal), -depth - 1, order,
+                                          neighbour, depth + 1))
+        return None
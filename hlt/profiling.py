@@ -0,0 +1,283 @@
+"""
+Per-turn timing of named scopes and call counts of hot functions.
+
+Bot code times its own phases with the shared profiler:
+
+    with profiler.scope("navigation"):
+        ...
+
+Scopes and counters cost next to nothing until the profiler is started, which Game does
+when created with profile=True. Each turn is then written as one JSON line to bot-{id}-timing.jsonl.
+
+For line level detail, StackSampler samples the bot's stack on selected turns only and writes
+collapsed stacks that flamegraph tools (flamegraph.pl, speedscope) render directly.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+
+class _NullScope:
+    """Scope handed out while the profiler is stopped."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+    """Adds the time spent inside a with block to a named scope."""
+    def __init__(self, timings, name, clock):
+        self._timings = timings
+        self._name = name
+        self._clock = clock
+        self._start = 0
+
+    def __enter__(self):
+        self._start = self._clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self._timings[self._name] = self._timings.get(self._name, 0) + self._clock() - self._start
+        return False
+
+
+class TurnProfiler:
+    """
+    Collects scope timings and call counts for the current turn and writes them out at its end.
+    """
+    def __init__(self, clock=time.perf_counter):
+        """
+        :param clock: Function returning the current time in seconds
+        """
+        self.enabled = False
+        self._clock = clock
+        self._file = None
+        self._timings = {}
+        self._counts = {}
+        self._originals = []
+        self._turn_start = None
+
+    def start(self, filename):
+        """
+        Starts collecting and writing per-turn results.
+        :param filename: The JSON lines file to write
+        :return: nothing.
+        """
+        self.stop()
+        self._file = open(filename, "w")
+        self.enabled = True
+        atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Stops collecting, restores instrumented functions and closes the output file.
+        :return: nothing.
+        """
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.enabled = False
+
+    def scope(self, name):
+        """
+        Returns a context manager adding the time spent in it to the named scope.
+        :param name: The scope name
+        :return: The context manager
+        """
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self._timings, name, self._clock)
+
+    def count(self, name, calls=1):
+        """
+        Adds to a named call counter.
+        :param name: The counter name
+        :param calls: How many calls to add
+        :return: nothing.
+        """
+        if self.enabled:
+            self._counts[name] = self._counts.get(name, 0) + calls
+
+    def instrument(self, owner, name, timed=False):
+        """
+        Wraps a function of a class or module so every call is counted under its name.
+        Only takes effect while the profiler is started, and is undone by stop.
+        :param owner: The class or module holding the function
+        :param name: The function name
+        :param timed: Whether to also add the time spent in the function to a scope of the same name
+        :return: nothing.
+        """
+        if not self.enabled:
+            return
+        original = owner.__dict__[name]
+        function = original.__func__ if isinstance(original, staticmethod) else original
+        counts = self._counts
+        timings = self._timings
+        clock = self._clock
+
+        if timed:
+            @functools.wraps(function)
+            def counted(*args, **kwargs):
+                counts[name] = counts.get(name, 0) + 1
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    timings[name] = timings.get(name, 0) + clock() - start
+        else:
+            @functools.wraps(function)
+            def counted(*args, **kwargs):
+                counts[name] = counts.get(name, 0) + 1
+                return function(*args, **kwargs)
+
+        setattr(owner, name, staticmethod(counted) if isinstance(original, staticmethod) else counted)
+        self._originals.append((owner, name, original))
+
+    def start_turn(self):
+        """
+        Marks the start of a turn.
+        :return: nothing.
+        """
+        if self.enabled:
+            self._turn_start = self._clock()
+
+    def end_turn(self, turn_number):
+        """
+        Writes the turn's timings (in milliseconds) and call counts, then resets them.
+        :param turn_number: The turn that ended
+        :return: nothing.
+        """
+        if not self.enabled:
+            return
+        row = {"turn": turn_number}
+        if self._turn_start is not None:
+            row["total_ms"] = round((self._clock() - self._turn_start) * 1000, 3)
+        row["scopes_ms"] = {name: round(seconds * 1000, 3) for name, seconds in self._timings.items()}
+        row["calls"] = dict(self._counts)
+        self._file.write(json.dumps(row, separators=(",", ":")) + "\n")
+        self._timings.clear()
+        self._counts.clear()
+        self._turn_start = None
+
+
+profiler = TurnProfiler()
+
+
+class StackSampler:
+    """
+    Samples the stack of the bot's thread from a background thread on selected turns.
+
+    Every Nth turn is written out, as is every turn slower than the latency threshold. Since a slow
+    turn is only known once it ended, a threshold means sampling all turns and discarding fast ones.
+    Each written turn becomes a collapsed-stack file with one "outer;...;inner count" line per stack.
+    """
+    def __init__(self, filename_pattern, every=0, threshold=None, interval=0.005, clock=time.perf_counter):
+        """
+        :param filename_pattern: Output file name, formatted with the turn number
+        :param every: Sample every Nth turn, 0 to not sample by turn number
+        :param threshold: Keep samples of turns taking longer than this many seconds, None to not
+        :param interval: Seconds between two samples
+        :param clock: Function returning the current time in seconds
+        """
+        self.filename_pattern = filename_pattern
+        self.every = every
+        self.threshold = threshold
+        self.interval = interval
+        self._clock = clock
+        self._thread_id = threading.get_ident()
+        self._samples = {}
+        # Guards the samples and the number of turns ended, which tells a sample taken before a
+        # turn ended from the next turn's
+        self._lock = threading.Lock()
+        self._ended = 0
+        self._armed = threading.Event()
+        self._stopped = False
+        self._turn_start = None
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+        self._thread.start()
+
+    def _is_sampled(self, turn_number):
+        return self.every > 0 and turn_number % self.every == 0
+
+    def start_turn(self, turn_number):
+        """
+        Starts sampling if this turn may be written out.
+        :param turn_number: The turn that started
+        :return: nothing.
+        """
+        self._turn_start = self._clock()
+        if self.threshold is not None or self._is_sampled(turn_number):
+            self._armed.set()
+
+    def end_turn(self, turn_number):
+        """
+        Stops sampling and writes the turn's stacks if it was selected or slower than the threshold.
+        :param turn_number: The turn that ended
+        :return: nothing.
+        """
+        with self._lock:
+            self._armed.clear()
+            self._ended += 1
+            samples, self._samples = self._samples, {}
+        if self._turn_start is None or not samples:
+            return
+        elapsed = self._clock() - self._turn_start
+        self._turn_start = None
+        if self._is_sampled(turn_number) or (self.threshold is not None and elapsed > self.threshold):
+            self.write(self.filename_pattern.format(turn_number), samples)
+
+    def stop(self):
+        """
+        Stops the sampling thread.
+        :return: nothing.
+        """
+        self._stopped = True
+        self._armed.set()
+
+    @staticmethod
+    def write(filename, samples):
+        """
+        Writes samples in collapsed-stack format.
+        :param filename: The file to write
+        :param samples: Mapping of stacks (tuples of frames, outermost first) to sample counts
+        :return: nothing.
+        """
+        with open(filename, "w") as folded_file:
+            for stack, count in sorted(samples.items(), key=lambda item: -item[1]):
+                frames = ("{} ({}:{})".format(name, os.path.basename(path), line) for path, name, line in stack)
+                folded_file.write("{} {}\n".format(";".join(frames), count))
+
+    def _run(self):
+        """Takes a sample every interval while armed."""
+        while True:
+            self._armed.wait()
+            if self._stopped:
+                return
+            time.sleep(self.interval)
+            with self._lock:
+                ended = self._ended
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None or not self._armed.is_set():
+                continue
+            stack = []
+            while frame is not None:
+                line = frame.f_lineno if frame.f_lineno is not None else frame.f_code.co_firstlineno
+                stack.append((frame.f_code.co_filename, frame.f_code.co_name, line))
+                frame = frame.f_back
+            stack = tuple(reversed(stack))
+            with self._lock:
+                # Dropped if the turn ended while the stack was walked
+                if self._ended == ended and self._armed.is_set():
+                    self._samples[stack] = self._samples.get(stack, 0) + 1
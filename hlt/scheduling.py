@@ -0,0 +1,87 @@
+import heapq
+import time
+
+from . import commands
+from .positionals import Direction
+
+_COMMAND_DIRECTIONS = {
+    commands.NORTH: Direction.North,
+    commands.SOUTH: Direction.South,
+    commands.EAST: Direction.East,
+    commands.WEST: Direction.West,
+    commands.STAY_STILL: Direction.Still,
+}
+
+
+class ShipScheduler:
+    """
+    Orders per-ship planning by priority and keeps track of the turn's time budget.
+
+    Ships are popped from a heap highest priority first, so when the budget runs out only the
+    least valuable ships are left to fall back on their cached (last turn's) move.
+    """
+    def __init__(self, time_budget=1.5, clock=time.perf_counter):
+        """
+        :param time_budget: Seconds of planning allowed per turn, None for no limit
+        :param clock: Function returning the current time in seconds
+        """
+        self.time_budget = time_budget
+        self._clock = clock
+        self._turn_start = clock()
+        self._cached_moves = {}
+
+    def start_turn(self, start=None):
+        """
+        Marks the start of the turn.
+        :param start: When the turn started on the scheduler's clock, e.g. Game.turn_start; None for now
+        :return: nothing.
+        """
+        self._turn_start = self._clock() if start is None else start
+
+    @property
+    def elapsed(self):
+        """
+        :return: Seconds spent since start_turn
+        """
+        return self._clock() - self._turn_start
+
+    @property
+    def over_budget(self):
+        """
+        :return: Whether this turn's planning time is used up
+        """
+        return self.time_budget is not None and self.elapsed >= self.time_budget
+
+    @staticmethod
+    def order(ships, priority):
+        """
+        Yields ships ordered by priority, highest first. Ties are broken by ship id.
+        :param ships: The ships to plan this turn
+        :param priority: Function taking a ship and returning its priority (larger is planned earlier)
+        :return: A generator of ships
+        """
+        heap = [(-priority(ship), ship.id, ship) for ship in ships]
+        heapq.heapify(heap)
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def cached_move(self, ship):
+        """
+        Returns the direction this ship was given last turn, or Still if it has none.
+        :param ship: The ship to look up
+        :return: A direction
+        """
+        return self._cached_moves.get(ship.id, Direction.Still)
+
+    def end_turn(self, command_queue):
+        """
+        Caches the move every ship was given this turn and forgets ships that received no command.
+        :param command_queue: The commands about to be sent to the engine
+        :return: nothing.
+        """
+        cached_moves = {}
+        for command in command_queue:
+            parts = command.split()
+            if len(parts) == 3 and parts[0] == commands.MOVE:
+                cached_moves[int(parts[1])] = _COMMAND_DIRECTIONS[parts[2]]
+        self._cached_moves = cached_moves
@@ -0,0 +1,239 @@
+"""
+Compact, forkable game states for lookahead search.
+
+A GameState is a flat halite list shared by every state forked from it, a dict of the
+cells changed since then, and small dicts of ships, banks and structures. Forking copies
+the dicts only, so it costs O(changed cells + ships), not a map. step applies one turn of
+commands the way the engine does and returns the next state, leaving this one untouched:
+
+    state = GameState.from_game(game)
+    child = state.step({game.my_id: command_queue})
+    child.halite(x, y), child.ships[ship_id].cargo, child.banks[game.my_id]
+"""
+import collections
+
+from . import commands, constants
+
+ShipState = collections.namedtuple("ShipState", "owner x y cargo")
+
+# (dx, dy) of every move command
+OFFSETS = {commands.NORTH: (0, -1), commands.SOUTH: (0, 1), commands.EAST: (1, 0), commands.WEST: (-1, 0),
+           commands.STAY_STILL: (0, 0)}
+
+
+class GameState:
+    """
+    Snapshot of the whole game. Treat the attributes as read-only, new states come from fork and step.
+    """
+    __slots__ = ("width", "height", "turn", "ships", "banks", "structures", "shipyards", "inspired",
+                 "next_ship_id", "_base", "_changes")
+
+    def __init__(self, width, height, turn, base, changes, ships, banks, structures, shipyards, inspired,
+                 next_ship_id):
+        """
+        :param base: Flat halite of every cell, index y * width + x, never modified
+        :param changes: Halite of the cells that differ from base, by index
+        :param ships: ShipState by ship id
+        :param banks: Halite of every player id
+        :param structures: Owner of the shipyard or dropoff at every (x, y)
+        :param shipyards: (x, y) of every player's shipyard
+        :param inspired: Ids of the ships inspired at the end of the previous turn
+        :param next_ship_id: Id the next spawned ship gets
+        """
+        self.width = width
+        self.height = height
+        self.turn = turn
+        self.ships = ships
+        self.banks = banks
+        self.structures = structures
+        self.shipyards = shipyards
+        self.inspired = inspired
+        self.next_ship_id = next_ship_id
+        self._base = base
+        self._changes = changes
+
+    @staticmethod
+    def from_game(game, previous=None):
+        """
+        Snapshots the current turn of a game.
+        :param game: The hlt.Game, after update_frame
+        :param previous: The snapshot of the previous turn, whose halite is updated from the changed cells
+            instead of reading every cell
+        :return: The GameState
+        """
+        game_map = game.game_map
+        width, height = game_map.width, game_map.height
+        if previous is None:
+            base = [cell.halite_amount for row in game_map._cells for cell in row]
+        else:
+            base = previous._flatten()
+            for x, y, halite in game_map.changed_cells:
+                base[y * width + x] = halite
+        ships, banks, structures, shipyards = {}, {}, {}, {}
+        for player_id, player in game.players.items():
+            banks[player_id] = player.halite_amount
+            shipyards[player_id] = (player.shipyard.position.x, player.shipyard.position.y)
+            for structure in [player.shipyard] + player.get_dropoffs():
+                structures[(structure.position.x, structure.position.y)] = player_id
+            for ship in player.get_ships():
+                ships[ship.id] = ShipState(player_id, ship.position.x, ship.position.y, ship.halite_amount)
+        next_ship_id = max(ships, default=-1) + 1
+        if previous is not None:
+            next_ship_id = max(next_ship_id, previous.next_ship_id)
+        state = GameState(width, height, game.turn_number, base, {}, ships, banks, structures, shipyards,
+                          frozenset(), next_ship_id)
+        state.inspired = state._inspired_ships()
+        return state
+
+    def halite(self, x, y):
+        """
+        :return: Halite of cell (x, y), coordinates wrap around
+        """
+        index = y % self.height * self.width + x % self.width
+        return self._changes.get(index, self._base[index])
+
+    @property
+    def done(self):
+        """
+        :return: Whether the game is over after this turn
+        """
+        return self.turn >= constants.MAX_TURNS
+
+    def fork(self):
+        """
+        :return: A state equal to this one that can be changed without affecting it
+        """
+        return GameState(self.width, self.height, self.turn, self._base, dict(self._changes), dict(self.ships),
+                         dict(self.banks), self.structures, self.shipyards, self.inspired, self.next_ship_id)
+
+    def step(self, player_commands):
+        """
+        Plays one turn: dropoffs and spawns, movement, collisions, deliveries and mining, then inspiration.
+        Ships without a command, and ships that cannot pay for their move, stay still.
+        :param player_commands: Command strings of every player id, as sent to the engine
+        :return: The next GameState
+        """
+        state = self.fork()
+        state.turn += 1
+        width, height = self.width, self.height
+        destinations = {}
+        stayed = set()
+        for player_id, command_queue in player_commands.items():
+            for command in command_queue:
+                parts = command.split()
+                if parts[0] == commands.GENERATE:
+                    if state.banks[player_id] >= constants.SHIP_COST:
+                        state.banks[player_id] -= constants.SHIP_COST
+                        state.ships[state.next_ship_id] = ShipState(player_id, *self.shipyards[player_id], 0)
+                        destinations[state.next_ship_id] = self.shipyards[player_id]
+                        state.next_ship_id += 1
+                elif parts[0] == commands.CONSTRUCT:
+                    state._construct(int(parts[1]), player_id)
+                elif parts[0] == commands.MOVE:
+                    ship_id = int(parts[1])
+                    ship = state.ships.get(ship_id)
+                    if ship is None or ship.owner != player_id or parts[2] == commands.STAY_STILL:
+                        continue
+                    index = ship.y * width + ship.x
+                    ratio = constants.INSPIRED_MOVE_COST_RATIO if ship_id in self.inspired \
+                        else constants.MOVE_COST_RATIO
+                    cost = state._changes.get(index, self._base[index]) // ratio
+                    if ship.cargo < cost:
+                        continue
+                    dx, dy = OFFSETS[parts[2]]
+                    destination = ((ship.x + dx) % width, (ship.y + dy) % height)
+                    state.ships[ship_id] = ShipState(player_id, destination[0], destination[1], ship.cargo - cost)
+                    destinations[ship_id] = destination
+        for ship_id, ship in state.ships.items():
+            if ship_id not in destinations:
+                destinations[ship_id] = (ship.x, ship.y)
+                stayed.add(ship_id)
+
+        state._collide(destinations)
+        # Mining uses the inspiration of the turn's start, the fork's copy of this state's
+        for ship_id, ship in list(state.ships.items()):
+            position = (ship.x, ship.y)
+            if state.structures.get(position) == ship.owner:
+                if ship.cargo:
+                    state.banks[ship.owner] += ship.cargo
+                    state.ships[ship_id] = ship._replace(cargo=0)
+            elif ship_id in stayed:
+                state._mine(ship_id, ship)
+        state.inspired = state._inspired_ships()
+        return state
+
+    def _construct(self, ship_id, player_id):
+        """Turns a ship into a dropoff if its player can pay for what its cargo and cell do not cover."""
+        ship = self.ships.get(ship_id)
+        if ship is None or ship.owner != player_id or (ship.x, ship.y) in self.structures:
+            return
+        index = ship.y * self.width + ship.x
+        cell = self._changes.get(index, self._base[index])
+        cost = max(0, constants.DROPOFF_COST - ship.cargo - cell)
+        if self.banks[player_id] < cost:
+            return
+        self.banks[player_id] += ship.cargo + cell - constants.DROPOFF_COST
+        self._changes[index] = 0
+        del self.ships[ship_id]
+        # Structures are shared with the parent state until they change
+        self.structures = dict(self.structures)
+        self.structures[(ship.x, ship.y)] = player_id
+
+    def _collide(self, destinations):
+        """Destroys ships ending on the same cell; their cargo goes to the cell, or the structure's owner."""
+        by_cell = {}
+        for ship_id, destination in destinations.items():
+            by_cell.setdefault(destination, []).append(ship_id)
+        for (x, y), ship_ids in by_cell.items():
+            if len(ship_ids) < 2:
+                continue
+            cargo = sum(self.ships.pop(ship_id).cargo for ship_id in ship_ids)
+            owner = self.structures.get((x, y))
+            if owner is not None:
+                self.banks[owner] += cargo
+            else:
+                index = y * self.width + x
+                self._changes[index] = self._changes.get(index, self._base[index]) + cargo
+
+    def _mine(self, ship_id, ship):
+        """Lets a ship that stayed still extract from its cell, up to its free capacity."""
+        index = ship.y * self.width + ship.x
+        cell = self._changes.get(index, self._base[index])
+        inspired = ship_id in self.inspired
+        ratio = constants.INSPIRED_EXTRACT_RATIO if inspired else constants.EXTRACT_RATIO
+        free = constants.MAX_HALITE - ship.cargo
+        extracted = min(-(-cell // ratio), free)
+        if not extracted:
+            return
+        bonus = min(int(extracted * constants.INSPIRED_BONUS_MULTIPLIER), free - extracted) if inspired else 0
+        self._changes[index] = cell - extracted
+        self.ships[ship_id] = ship._replace(cargo=ship.cargo + extracted + bonus)
+
+    def _inspired_ships(self):
+        """Ids of the ships with enough opponent ships within the inspiration radius."""
+        if not constants.INSPIRATION_ENABLED:
+            return frozenset()
+        radius, needed = constants.INSPIRATION_RADIUS, constants.INSPIRATION_SHIP_COUNT
+        width, height = self.width, self.height
+        # After collisions a cell holds one ship at most
+        owners = {(ship.x, ship.y): ship.owner for ship in self.ships.values()}
+        offsets = [(dx, dy) for dx in range(-radius, radius + 1)
+                   for dy in range(abs(dx) - radius, radius - abs(dx) + 1) if dx or dy]
+        inspired = set()
+        for ship_id, ship in self.ships.items():
+            count = 0
+            for dx, dy in offsets:
+                owner = owners.get(((ship.x + dx) % width, (ship.y + dy) % height))
+                if owner is not None and owner != ship.owner:
+                    count += 1
+                    if count >= needed:
+                        inspired.add(ship_id)
+                        break
+        return frozenset(inspired)
+
+    def _flatten(self):
+        """Flat halite of every cell as a new list."""
+        cells = list(self._base)
+        for index, halite in self._changes.items():
+            cells[index] = halite
+        return cells
@@ -0,0 +1,149 @@
+"""
+Content-addressed store of match results.
+
+A result is keyed by a hash of every participant's source (the bot script plus every local
+module it imports and the files its arguments name), the seat order, the map size and the seed. Editing one bot only
+invalidates the games it played in; everything else is reused on the next evaluation.
+"""
+import ast
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATH = os.path.join(ROOT, "match_results.sqlite")
+
+
+def _imported_names(path):
+    """
+    :return: The absolute module names a source file imports, anywhere in it
+    """
+    with open(path, "rb") as source_file:
+        tree = ast.parse(source_file.read(), path)
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module)
+    return names
+
+
+def local_sources(script, root=ROOT):
+    """
+    Finds the source files a bot runs: the script and the local modules it imports, transitively.
+    A local package counts as a whole, which covers its imports of its own modules. The hlt
+    package is always included, for the packed Benchmark bots that import it from compressed code.
+    :param script: Path of the bot script relative to root
+    :param root: Directory holding the bots and their modules
+    :return: Sorted list of paths
+    """
+    sources = set()
+    pending = [os.path.join(root, script), os.path.join(root, "hlt")]
+    while pending:
+        path = pending.pop()
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in os.listdir(path) if name.endswith(".py")]
+        else:
+            files = [path]
+        for file_path in files:
+            if file_path in sources:
+                continue
+            sources.add(file_path)
+            for name in _imported_names(file_path):
+                top = name.split(".")[0]
+                package, module = os.path.join(root, top), os.path.join(root, top + ".py")
+                if os.path.isfile(os.path.join(package, "__init__.py")):
+                    pending.append(package)
+                elif os.path.isfile(module):
+                    pending.append(module)
+    return sorted(sources)
+
+
+def argument_files(arguments, root=ROOT):
+    """
+    :param arguments: A bot's command line arguments
+    :param root: Directory the bots run from
+    :return: The files the arguments name, e.g. the JSON file of --params, in argument order
+    """
+    paths = (os.path.join(root, argument) for argument in arguments.split())
+    return [path for path in paths if os.path.isfile(path)]
+
+
+def source_hash(bot, root=ROOT):
+    """
+    Hashes a bot script together with every local module it imports, the bot's arguments and
+    the contents of the files they name, so editing a parameters file in place is noticed.
+    :param bot: Path of the bot script relative to root, optionally followed by its arguments
+    :param root: Directory holding the bots and their modules
+    :return: Hex digest
+    """
+    script, _, arguments = bot.partition(" ")
+    digest = hashlib.sha256(arguments.encode())
+    for path in local_sources(script, root) + argument_files(arguments, root):
+        digest.update(os.path.relpath(path, root).replace(os.sep, "/").encode())
+        with open(path, "rb") as source_file:
+            digest.update(hashlib.sha256(source_file.read()).digest())
+    return digest.hexdigest()
+
+
+class MatchStore:
+    """
+    SQLite backed result store. Only the process owning it reads and writes it.
+    """
+    def __init__(self, path=DEFAULT_PATH, root=ROOT):
+        """
+        :param path: The SQLite database file, created if missing
+        :param root: Directory holding the bots and their modules
+        """
+        self.root = root
+        self._hashes = {}
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, bots TEXT, map_size INTEGER, seed INTEGER, result TEXT, created REAL)")
+        self._connection.commit()
+
+    def key(self, match):
+        """
+        :param match: A tournament.Match
+        :return: The content hash identifying the match
+        """
+        participants = []
+        for bot in match.bots:
+            if bot not in self._hashes:
+                self._hashes[bot] = source_hash(bot, self.root)
+            participants.append(self._hashes[bot])
+        description = json.dumps([participants, match.map_size, len(match.bots), match.seed])
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, match):
+        """
+        :param match: A tournament.Match
+        :return: The stored result, or None if the match was not played with these sources
+        """
+        row = self._connection.execute("SELECT result FROM results WHERE key = ?", (self.key(match),)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, match, result):
+        """
+        Stores a result, replacing any earlier one of the same match.
+        :param match: A tournament.Match
+        :param result: Its result
+        :return: nothing.
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key(match), json.dumps(list(match.bots)), match.map_size, match.seed, json.dumps(result),
+             time.time()))
+        self._connection.commit()
+
+    def close(self):
+        """
+        Closes the database.
+        :return: nothing.
+        """
+        self._connection.close()
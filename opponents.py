@@ -0,0 +1,222 @@
+"""
+In-process opponents with a common per-turn interface.
+
+The Benchmark*Collector.py bots are pyminifier output that decompresses and compiles itself
+on every launch and can only run as a script. unpack() decompresses one once into a cached
+module in opponent_cache/, with the code before the game loop moved into setup() and the
+loop body into turn(). Python then keeps its bytecode in __pycache__ like any other module.
+
+Every player here has play_turn(game), returning the turn's commands:
+
+    opponent = BenchmarkOpponent("BenchmarkCollector.py", game)
+    commands = opponent.play_turn(game)
+
+The game passed in must already hold the turn's state from the player's point of view.
+update_frame, ready and end_turn calls the opponent makes on it are intercepted.
+"""
+import ast
+import base64
+import hashlib
+import importlib.util
+import os
+import re
+import textwrap
+import zlib
+
+import hlt
+
+import MyBot
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_DIR = os.path.join(ROOT, "opponent_cache")
+
+BENCHMARK_BOTS = ("BenchmarkCollector.py", "BenchmarkHopperCollector.py", "BenchmarkPriorityCollector.py")
+
+# pyminifier renamed "from hlt.positionals import" to an import from its alias, e.g. "i=hlt.positionals"
+_ALIAS_IMPORT = re.compile(r"^from (\w+) import", re.M)
+
+# Repairs of names pyminifier made collide, by bot: (original text, replacement)
+FIXES = {
+    # The state dict x is overwritten by the x loop over each 8x8 block
+    "BenchmarkHopperCollector.py": [
+        ("for x in V(C,C+8):\n     L=u[f(x,y)].halite_amount", "for _x in V(C,C+8):\n     L=u[f(_x,y)].halite_amount"),
+        ("K=(x,y)", "K=(_x,y)"),
+    ],
+}
+
+
+def decompress(path):
+    """
+    :param path: Path of a pyminifier bot
+    :return: Its decompressed source
+    """
+    with open(path) as packed_file:
+        packed = packed_file.read()
+    payload = re.search(r"b64decode\('([^']+)'\)", packed).group(1)
+    return zlib.decompress(base64.b64decode(payload)).decode()
+
+
+def _bound_names(statements):
+    """Names a list of module level statements binds, not counting nested scopes."""
+    names = set()
+    scopes = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+              ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            continue
+        if isinstance(node, scopes):
+            continue
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        pending.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def _source_lines(lines, statements):
+    first, last = statements[0].lineno - 1, statements[-1].end_lineno
+    return textwrap.dedent("\n".join(lines[first:last]))
+
+
+def convert(source, name):
+    """
+    Turns a bot script into module source with setup() and turn() functions.
+    :param source: The bot's script source
+    :param name: The bot's file name, used for fixes and the module docstring
+    :return: The module source
+    """
+    for original, replacement in FIXES.get(name, ()):
+        source = source.replace(original, replacement)
+    aliases = dict(re.findall(r"^(\w+)=(hlt\.\w+)$", source, re.M))
+    source = _ALIAS_IMPORT.sub(lambda match: "from {} import".format(aliases.get(match.group(1), match.group(1))),
+                               source)
+
+    module = ast.parse(source)
+    loop_index = next(index for index, node in enumerate(module.body) if isinstance(node, ast.While))
+    setup_statements = module.body[:loop_index]
+    turn_statements = module.body[loop_index].body
+    names = sorted(_bound_names(setup_statements + turn_statements))
+    declaration = "global " + ", ".join(names) if names else "pass"
+
+    lines = source.split("\n")
+    return '"""Unpacked from {} by opponents.py, do not edit."""\n\n\ndef setup():\n{}\n\n\ndef turn():\n{}\n'.format(
+        name,
+        textwrap.indent(declaration + "\n" + _source_lines(lines, setup_statements), "    "),
+        textwrap.indent(declaration + "\n" + _source_lines(lines, turn_statements), "    "),
+    )
+
+
+def unpack(name, root=ROOT, cache_dir=CACHE_DIR):
+    """
+    Unpacks a pyminifier bot into the cache, unless the cache already holds this version of it.
+    :param name: The bot's file name
+    :param root: Directory holding the bot
+    :param cache_dir: Directory of unpacked modules
+    :return: Path of the unpacked module
+    """
+    path = os.path.join(root, name)
+    with open(path, "rb") as packed_file:
+        digest = hashlib.sha256(packed_file.read()).hexdigest()[:12]
+    cached = os.path.join(cache_dir, "{}_{}.py".format(os.path.splitext(name)[0], digest))
+    if not os.path.exists(cached):
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cached + ".tmp", "w") as module_file:
+            module_file.write(convert(decompress(path), name))
+        os.replace(cached + ".tmp", cached)
+    return cached
+
+
+def load(name, root=ROOT, cache_dir=CACHE_DIR):
+    """
+    Imports a fresh instance of an unpacked bot, so every opponent keeps its own state.
+    :param name: The bot's file name
+    :return: The module
+    """
+    path = unpack(name, root, cache_dir)
+    module_name = "opponent_cache." + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _InterceptedGame:
+    """Game seen by an in-process opponent: engine I/O is intercepted, everything else is the real game."""
+    def __init__(self, game):
+        self.game = game
+        self.name = None
+        self.commands = None
+
+    def __getattr__(self, name):
+        return getattr(self.game, name)
+
+    def ready(self, name):
+        self.name = name
+
+    def update_frame(self):
+        pass
+
+    def end_turn(self, commands):
+        self.commands = list(commands)
+
+
+class BenchmarkOpponent:
+    """
+    A Benchmark*Collector.py bot running in this process.
+    """
+    def __init__(self, name, game, root=ROOT, cache_dir=CACHE_DIR):
+        """
+        :param name: The bot's file name
+        :param game: The hlt.Game holding the initial state from this bot's point of view
+        """
+        self._module = load(name, root, cache_dir)
+        self._game = _InterceptedGame(game)
+        game_class = hlt.Game
+        hlt.Game = lambda *args, **kwargs: self._game
+        try:
+            self._module.setup()
+        finally:
+            hlt.Game = game_class
+        self.name = self._game.name
+
+    def play_turn(self, game):
+        """
+        :param game: The game holding this turn's state
+        :return: The commands of this turn
+        """
+        self._game.game = game
+        self._game.commands = None
+        self._module.turn()
+        return self._game.commands
+
+
+class MyBotPlayer:
+    """
+    MyBot.py behind the same interface, keeping its per-ship state between turns.
+    """
+    name = "ScapoBot"
+
+    def __init__(self, game, params=None, time_budget=None):
+        """
+        :param game: The hlt.Game holding the initial state from this bot's point of view
+        :param params: MyBot.Parameters, defaults to MyBot's
+        :param time_budget: Planning seconds per turn, None for no limit
+        """
+        self._params = params or MyBot.DEFAULT_PARAMETERS
+        self._ship_status = {}
+        self._scheduler = hlt.scheduling.ShipScheduler(time_budget)
+
+    def play_turn(self, game):
+        """
+        :param game: The game holding this turn's state
+        :return: The commands of this turn
+        """
+        self._scheduler.start_turn()
+        commands = MyBot.play_turn(game, self._ship_status, self._scheduler, self._params)
+        self._scheduler.end_turn(commands)
+        return commands
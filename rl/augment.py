@@ -0,0 +1,85 @@
+"""
+Symmetry augmentation of training batches.
+
+Maps wrap around and the rules do not care about orientation, so rotating, mirroring or
+shifting an observation (with its actions turned the same way) gives another valid sample.
+Every sample of a batch gets its own random transform, all applied in one gather:
+
+    augment = Augmenter(15, shift=False)
+    batch = augment(batch, generator)
+"""
+import itertools
+
+import numpy as np
+
+from hlt.positionals import Direction
+
+from .replay_buffer import Batch
+
+# Model actions in output order, as in MyBot_RL.ACTIONS
+ACTIONS = (Direction.Still, Direction.North, Direction.South, Direction.East, Direction.West)
+
+# The 8 symmetries of the square as (transpose, mirror x, mirror y)
+DIHEDRAL = tuple(itertools.product((False, True), repeat=3))
+
+
+class Augmenter:
+    """
+    Applies a random dihedral transform, and optionally a random torus shift, to each sample.
+
+    Shifts only make sense for whole-map observations; egocentric views must keep the ship
+    in the centre, which an odd sized view does under all 8 dihedral transforms.
+    """
+    def __init__(self, size, shift=True, actions=ACTIONS):
+        """
+        :param size: Side of the square observations, indexed [x, y, channel]
+        :param shift: Whether to also shift samples by a random offset, wrapping around
+        :param actions: Direction of every action index
+        """
+        self.size = size
+        self.shift = shift
+        xs, ys = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+        # Source x and y of every output cell, by transform
+        self._source_x = np.empty((len(DIHEDRAL), size, size), dtype=np.int64)
+        self._source_y = np.empty_like(self._source_x)
+        # Output action of every source action, by transform
+        self.action_maps = np.empty((len(DIHEDRAL), len(actions)), dtype=np.int64)
+        for index, (transpose, mirror_x, mirror_y) in enumerate(DIHEDRAL):
+            source_x, source_y = (ys, xs) if transpose else (xs, ys)
+            self._source_x[index] = size - 1 - source_x if mirror_x else source_x
+            self._source_y[index] = size - 1 - source_y if mirror_y else source_y
+            for action, (dx, dy) in enumerate(actions):
+                dx, dy = -dx if mirror_x else dx, -dy if mirror_y else dy
+                self.action_maps[index, action] = actions.index((dy, dx) if transpose else (dx, dy))
+
+    def transform(self, states, transforms, shifts_x, shifts_y):
+        """
+        :param states: Array of shape (batch, size, size, channels)
+        :param transforms: Dihedral transform index of every sample
+        :param shifts_x: x offset of every sample
+        :param shifts_y: y offset of every sample
+        :return: The transformed states, a new array
+        """
+        source_x = (self._source_x[transforms] + shifts_x[:, None, None]) % self.size
+        source_y = (self._source_y[transforms] + shifts_y[:, None, None]) % self.size
+        flat = (source_x * self.size + source_y).reshape(len(states), -1, 1)
+        gathered = np.take_along_axis(states.reshape(len(states), self.size * self.size, -1), flat, axis=1)
+        return gathered.reshape(states.shape)
+
+    def __call__(self, batch, generator):
+        """
+        Transforms a batch's states and next states alike and remaps its actions.
+        :param batch: A replay_buffer.Batch
+        :param generator: A numpy Generator
+        :return: The augmented Batch
+        """
+        count = len(batch.actions)
+        transforms = generator.integers(0, len(DIHEDRAL), count)
+        if self.shift:
+            shifts_x = generator.integers(0, self.size, count)
+            shifts_y = generator.integers(0, self.size, count)
+        else:
+            shifts_x = shifts_y = np.zeros(count, dtype=np.int64)
+        return batch._replace(states=self.transform(batch.states, transforms, shifts_x, shifts_y),
+                              next_states=self.transform(batch.next_states, transforms, shifts_x, shifts_y),
+                              actions=self.action_maps[transforms, batch.actions])
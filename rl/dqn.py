@@ -0,0 +1,50 @@
+"""
+Batched deep Q-learning update shared by the DQN agents.
+
+One update takes a sampled Batch of stacked transitions, computes every target with a
+single forward pass and trains with a single train_on_batch call, instead of two
+predicts and one fit per transition.
+"""
+import numpy as np
+
+
+def q_targets(model, states, actions, rewards, next_states, dones, gamma, target_model=None):
+    """
+    Computes training targets: the model's own Q-values, with the taken action's value replaced by
+    reward + gamma * max Q(next_state), or just reward for terminal transitions.
+    Without a target model, states and next states go through the model in one forward pass.
+    :param model: The Keras model being trained
+    :param gamma: Discount rate
+    :param target_model: Model estimating next state values, None to use model itself
+    :return: Array of targets shaped like the model's output, and the TD error of every transition
+    """
+    count = len(states)
+    if target_model is None:
+        q_values = np.asarray(model.predict_on_batch(np.concatenate([states, next_states])))
+        q_values, next_q_values = q_values[:count], q_values[count:]
+    else:
+        q_values = np.asarray(model.predict_on_batch(states))
+        next_q_values = np.asarray(target_model.predict_on_batch(next_states))
+    rows = np.arange(count)
+    targets = q_values.copy()
+    targets[rows, actions] = rewards + gamma * (1 - dones) * next_q_values.max(axis=1)
+    return targets, targets[rows, actions] - q_values[rows, actions]
+
+
+def batch_update(model, batch, gamma, target_model=None):
+    """
+    Applies one batched Q-learning update to a batch sampled from a ReplayBuffer,
+    weighting each transition's loss by the batch's importance sampling weights.
+    :param model: The Keras model being trained
+    :param batch: A replay_buffer.Batch
+    :param gamma: Discount rate
+    :param target_model: Model estimating next state values, None to use model itself
+    :return: The training loss and the TD error of every transition
+    """
+    states = batch.states.astype(np.float32, copy=False)
+    next_states = batch.next_states.astype(np.float32, copy=False)
+    targets, td_errors = q_targets(model, states, batch.actions, batch.rewards, next_states, batch.dones, gamma,
+                                   target_model)
+    loss = model.train_on_batch(states, targets, sample_weight=batch.weights)
+    return loss, td_errors
+
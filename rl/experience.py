@@ -0,0 +1,64 @@
+"""
+Turns a bot's per-turn views and actions into transitions for a replay store.
+
+A ship's transition from one turn is completed on the next, once its outcome is known:
+
+* delivered: it stands on one of our structures with an empty hold, reward is the cargo it had
+* still out: reward is MINING_WEIGHT times its cargo change, negative when moving costs halite
+* gone: it became a dropoff (reward 0) or was destroyed (reward minus its lost cargo), done
+"""
+import numpy as np
+
+# Mined halite only counts fully once delivered
+MINING_WEIGHT = 0.25
+
+
+class ExperienceRecorder:
+    """
+    Records the transitions of the bot's ships into a ReplayStore (or ReplayBuffer).
+    """
+    def __init__(self, store, flush_every=20):
+        """
+        :param store: Where transitions go
+        :param flush_every: Turns between two flushes, which make the transitions visible to readers
+        """
+        self.store = store
+        self.flush_every = flush_every
+        self._pending = {}
+        self._turns = 0
+
+    def record(self, ships, views, actions, structure_positions):
+        """
+        Completes the previous turn's transitions and keeps this turn's views and actions for the next call.
+        :param ships: This turn's ships, in the order of views and actions
+        :param views: Every ship's observation
+        :param actions: Every ship's action index
+        :param structure_positions: Positions of our shipyard and dropoffs
+        :return: nothing.
+        """
+        current = {ship.id: index for index, ship in enumerate(ships)}
+        for ship_id, (view, action, cargo, position) in self._pending.items():
+            index = current.get(ship_id)
+            if index is None:
+                reward = 0 if position in structure_positions else -cargo
+                self.store.add(view, action, reward, np.zeros_like(view), True)
+                continue
+            ship = ships[index]
+            if ship.halite_amount == 0 and cargo > 0 and ship.position in structure_positions:
+                reward = cargo
+            else:
+                reward = MINING_WEIGHT * (ship.halite_amount - cargo)
+            self.store.add(view, action, reward, views[index], False)
+        self._pending = {ship.id: (views[index], actions[index], ship.halite_amount, ship.position)
+                         for index, ship in enumerate(ships)}
+        self._turns += 1
+        if self._turns % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        """
+        Makes recorded transitions visible to readers of the store.
+        :return: nothing.
+        """
+        if hasattr(self.store, "flush"):
+            self.store.flush()
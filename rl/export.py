@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Exports a trained Keras model for hlt.inference, so bots run it without TensorFlow.
+
+    python3 -m rl.export model.h5 policy.npz
+
+The .npz holds the layer configs as JSON under "layers" and each layer's weights under
+"<layer index>_<weight number>", all in float32.
+"""
+import argparse
+import json
+
+import numpy as np
+
+# Keras layer class: our layer type; layers missing here fail the export, InputLayer and Dropout are dropped
+LAYER_TYPES = {"Dense": "dense", "Conv2D": "conv2d", "Flatten": "flatten"}
+SKIPPED_LAYERS = ("InputLayer", "Dropout")
+
+
+def layer_config(layer):
+    """
+    :param layer: A Keras layer
+    :return: Its config for hlt.inference, None if inference skips it
+    """
+    kind = type(layer).__name__
+    if kind in SKIPPED_LAYERS:
+        return None
+    if kind not in LAYER_TYPES:
+        raise ValueError("Cannot export {} layer {}".format(kind, layer.name))
+    keras_config = layer.get_config()
+    config = {"type": LAYER_TYPES[kind], "name": layer.name, "weights": len(layer.get_weights())}
+    if "activation" in keras_config:
+        config["activation"] = keras_config["activation"]
+    if kind == "Conv2D":
+        if keras_config.get("data_format", "channels_last") != "channels_last" or \
+                tuple(keras_config.get("dilation_rate", (1, 1))) != (1, 1):
+            raise ValueError("Cannot export conv layer {}: only channels_last without dilation".format(layer.name))
+        config["strides"] = list(keras_config["strides"])
+        config["padding"] = keras_config["padding"]
+    return config
+
+
+def export(model, path, circular=False):
+    """
+    Writes a Sequential Keras model's layers and weights to an .npz file.
+    :param model: The Keras model
+    :param path: The .npz file to write
+    :param circular: Run "same" padded conv layers with circular padding, for models trained on wrapped inputs
+    :return: nothing.
+    """
+    layers = []
+    arrays = {}
+    for layer in model.layers:
+        config = layer_config(layer)
+        if config is None:
+            continue
+        if circular and config.get("padding") == "same":
+            config["padding"] = "circular"
+        for number, weights in enumerate(layer.get_weights()):
+            arrays["{}_{}".format(len(layers), number)] = np.asarray(weights, dtype=np.float32)
+        layers.append(config)
+    np.savez_compressed(path, layers=np.array(json.dumps(layers)), **arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", help="Keras model file")
+    parser.add_argument("output", help=".npz file to write")
+    parser.add_argument("--circular", action="store_true", help="run same-padded convolutions with circular padding")
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model
+    export(load_model(args.model), args.output, args.circular)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Keras models of the RL bots, shared by MyBot_RL.py and the self-play learner.
+
+TensorFlow is imported when a model is built, not with this module.
+"""
+
+
+def policy_network(input_shape, actions, learning_rate=0.001):
+    """
+    Q-network over one ship's egocentric view.
+    :param input_shape: (view size, view size, channels)
+    :param actions: Number of actions
+    :param learning_rate: Adam learning rate
+    :return: The compiled Keras model
+    """
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Conv2D, Flatten
+    from tensorflow.keras.optimizers import Adam
+
+    model = Sequential()
+    model.add(Conv2D(16, 3, activation='relu', input_shape=input_shape))
+    model.add(Conv2D(32, 3, activation='relu'))
+    model.add(Flatten())
+    model.add(Dense(64, activation='relu'))
+    model.add(Dense(actions, activation='linear'))
+    model.compile(optimizer=Adam(lr=learning_rate), loss='mse')
+
+    return model
@@ -0,0 +1,185 @@
+"""
+Preallocated ring replay buffer with uniform or prioritized sampling.
+
+Transitions live in one NumPy array per field, so adding is a row write, sampling a batch
+is one fancy-indexing gather per field, and memory is exactly capacity rows of each field
+instead of a tuple of small arrays per transition.
+"""
+import collections
+
+import numpy as np
+
+Batch = collections.namedtuple("Batch", "states actions rewards next_states dones indices weights")
+
+
+class SumTree:
+    """
+    Binary tree of priority sums over a fixed number of leaves, stored in one array
+    (node i has children 2i and 2i+1, the root is node 1). Updates and lookups of a
+    whole batch are vectorized one tree level at a time.
+    """
+    def __init__(self, capacity):
+        """
+        :param capacity: Number of leaves
+        """
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self._tree = np.zeros(2 * self.leaves)
+
+    @property
+    def total(self):
+        """
+        :return: Sum of all priorities
+        """
+        return self._tree[1]
+
+    def __getitem__(self, indices):
+        return self._tree[np.asarray(indices) + self.leaves]
+
+    def set(self, index, priority):
+        """
+        Sets one leaf priority, walking up the tree without array overhead.
+        :param index: Leaf index
+        :param priority: Its new priority
+        :return: nothing.
+        """
+        tree = self._tree
+        node = index + self.leaves
+        tree[node] = priority
+        node //= 2
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def update(self, indices, priorities):
+        """
+        Sets leaf priorities and refreshes the sums above them.
+        :param indices: Leaf indices, unique
+        :param priorities: Their new priorities
+        :return: nothing.
+        """
+        nodes = np.asarray(indices) + self.leaves
+        self._tree[nodes] = priorities
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self._tree[nodes] = self._tree[2 * nodes] + self._tree[2 * nodes + 1]
+
+    def find(self, values):
+        """
+        Finds the leaves whose cumulative priority ranges contain the given values.
+        :param values: Values in [0, total)
+        :return: Leaf indices
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            go_right = values >= self._tree[left]
+            values = np.where(go_right, values - self._tree[left], values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaves
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of (state, action, reward, next_state, done) transitions. Once full, the
+    oldest transition is overwritten.
+
+    In prioritized mode transitions are sampled with probability proportional to
+    priority ** alpha, new transitions getting the highest priority seen so far, and
+    batches carry importance sampling weights corrected by beta.
+    """
+    def __init__(self, capacity, state_shape=None, state_dtype=np.float32, prioritized=False, alpha=0.6,
+                 beta=0.4, epsilon=1e-3, seed=None):
+        """
+        :param capacity: Most transitions kept
+        :param state_shape: Shape of one state without a batch axis, None to take it from the first state added
+        :param state_dtype: Type states are stored as, e.g. np.uint16 for halite counts
+        :param prioritized: Whether to sample by priority instead of uniformly
+        :param alpha: How strongly priorities skew sampling, 0 is uniform
+        :param beta: Importance sampling correction, 1 corrects fully
+        :param epsilon: Added to absolute TD errors so no transition gets priority 0
+        :param seed: Seed of the sampling generator
+        """
+        self.capacity = capacity
+        self.state_dtype = state_dtype
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self._random = np.random.default_rng(seed)
+        self._next = 0
+        self._size = 0
+        self._states = None
+        self._next_states = None
+        self._actions = np.zeros(capacity, dtype=np.int64)
+        self._rewards = np.zeros(capacity, dtype=np.float32)
+        self._dones = np.zeros(capacity, dtype=np.float32)
+        self._tree = SumTree(capacity) if prioritized else None
+        self._max_priority = 1.0
+        if state_shape is not None:
+            self._allocate(state_shape)
+
+    def _allocate(self, state_shape):
+        self._states = np.zeros((self.capacity,) + tuple(state_shape), dtype=self.state_dtype)
+        self._next_states = np.zeros_like(self._states)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, state, action, reward, next_state, done):
+        """
+        Stores one transition.
+        :param state: The state, with or without a leading batch axis of 1
+        :return: nothing.
+        """
+        state = np.asarray(state)
+        next_state = np.asarray(next_state)
+        if self._states is None:
+            self._allocate(state.shape[1:] if state.ndim > 1 and state.shape[0] == 1 else state.shape)
+        index = self._next
+        self._states[index] = state.reshape(self._states.shape[1:])
+        self._next_states[index] = next_state.reshape(self._states.shape[1:])
+        self._actions[index] = action
+        self._rewards[index] = reward
+        self._dones[index] = done
+        if self._tree is not None:
+            self._tree.set(index, self._max_priority ** self.alpha)
+        self._next = (index + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Samples a batch with replacement.
+        :param batch_size: Transitions in the batch
+        :return: A Batch; weights are all 1 unless prioritized
+        """
+        if self._tree is None:
+            indices = self._random.integers(0, self._size, batch_size)
+            weights = np.ones(batch_size, dtype=np.float32)
+        else:
+            # Stratified: one value from each of batch_size equal slices of the total priority
+            total = self._tree.total
+            values = (np.arange(batch_size) + self._random.random(batch_size)) * (total / batch_size)
+            indices = np.minimum(self._tree.find(np.minimum(values, np.nextafter(total, 0))), self._size - 1)
+            probabilities = self._tree[indices] / total
+            weights = (self._size * probabilities) ** -self.beta
+            weights = (weights / weights.max()).astype(np.float32)
+        return Batch(self._states[indices], self._actions[indices], self._rewards[indices],
+                     self._next_states[indices], self._dones[indices], indices, weights)
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Sets the priorities of sampled transitions from their TD errors. Does nothing unless prioritized.
+        :param indices: The batch's indices
+        :param td_errors: The batch's TD errors
+        :return: nothing.
+        """
+        if self._tree is None:
+            return
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self._max_priority = max(self._max_priority, priorities.max())
+        # A transition sampled twice keeps its last priority
+        indices, positions = np.unique(np.asarray(indices)[::-1], return_index=True)
+        self._tree.update(indices, priorities[::-1][positions] ** self.alpha)
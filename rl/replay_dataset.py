@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Converts recorded games into imitation learning datasets.
+
+Two kinds of recordings are read, one turn at a time so a game is never held in memory:
+
+* engine replays (.hlt, zstd compressed JSON, needs the zstandard package; or the JSON
+  itself as .json). Every player's moves are in the replay, so each player becomes a shard.
+  Each full frame is taken to hold the entities at the start of its turn, the cell changes
+  since the previous frame and the moves made in it.
+* frame recordings (.txt): the engine's input to one bot, as hlt reads it from stdin.
+  Moves are not in it, so every ship's action is inferred from where it is on the next turn.
+
+A shard is three files next to each other:
+
+* <name>.observations.bin: one hlt.features.FeatureBuilder tensor per turn, from the player's point of view
+* <name>.actions.bin: ACTION_DTYPE records of every ship's action, pointing at their turn
+* <name>.json: shapes, types and counts, which load_shard uses to map the other two
+
+    python3 -m rl.replay_dataset replays/ dataset/ --workers 8
+"""
+import argparse
+import concurrent.futures
+import io
+import json
+import os
+import sys
+
+import numpy as np
+
+import hlt
+from hlt.entity import Dropoff, Ship, Shipyard
+from hlt.features import FeatureBuilder
+from hlt.game_map import GameMap, MapCell, Player
+from hlt.positionals import Position
+
+# Action of every move command, in rl.augment.ACTIONS order, plus turning into a dropoff
+COMMAND_ACTIONS = {"o": 0, "n": 1, "s": 2, "e": 3, "w": 4}
+CONSTRUCT = 5
+
+ACTION_DTYPE = np.dtype([("turn", np.int32), ("ship", np.int32), ("x", np.int16), ("y", np.int16),
+                         ("action", np.int8)])
+
+RECORDING_EXTENSIONS = (".hlt", ".json", ".txt")
+
+
+class ShardWriter:
+    """
+    Appends observations and action records to a shard's files.
+    """
+    def __init__(self, prefix, dtype=np.float32, action_dtype=ACTION_DTYPE):
+        """
+        :param prefix: Path of the shard without extension
+        :param dtype: Type observations are stored as
+        :param action_dtype: Record type of the actions, ACTION_DTYPE's fields first
+        """
+        self.prefix = prefix
+        self.dtype = np.dtype(dtype)
+        self.action_dtype = action_dtype
+        self.turns = 0
+        self.actions = 0
+        self.observation_shape = None
+        self._observations = open(prefix + ".observations.bin", "wb")
+        self._actions = open(prefix + ".actions.bin", "wb")
+
+    def write_observation(self, observation):
+        """
+        :param observation: The turn's feature tensor
+        :return: The turn's index in the shard
+        """
+        self.observation_shape = observation.shape
+        self._observations.write(observation.astype(self.dtype, copy=False).tobytes())
+        self.turns += 1
+        return self.turns - 1
+
+    def write_observations(self, observations):
+        """
+        :param observations: Consecutive turns' feature tensors, stacked
+        :return: The first turn's index in the shard
+        """
+        self.observation_shape = observations.shape[1:]
+        self._observations.write(observations.astype(self.dtype, copy=False).tobytes())
+        self.turns += len(observations)
+        return self.turns - len(observations)
+
+    def write_actions(self, rows):
+        """
+        :param rows: Tuples of the action record's fields, (turn, ship, x, y, action) by default
+        :return: nothing.
+        """
+        if rows:
+            self._actions.write(np.array(rows, dtype=self.action_dtype).tobytes())
+            self.actions += len(rows)
+
+    def close(self, **meta):
+        """
+        Closes the data files and writes the shard's description.
+        :param meta: Extra entries for the description
+        :return: nothing.
+        """
+        self._observations.close()
+        self._actions.close()
+        description = dict(meta, observation_shape=list(self.observation_shape or ()), dtype=self.dtype.str,
+                           action_fields=[[name, self.action_dtype[name].str] for name in self.action_dtype.names],
+                           turns=self.turns, actions=self.actions)
+        with open(self.prefix + ".json", "w") as description_file:
+            json.dump(description, description_file)
+
+
+def load_shard(prefix):
+    """
+    Maps a shard read-only.
+    :param prefix: Path of the shard without extension
+    :return: Observations of shape (turns, width, height, channels), action records, and the description
+    """
+    with open(prefix + ".json") as description_file:
+        description = json.load(description_file)
+    action_dtype = np.dtype([tuple(field) for field in description["action_fields"]]) \
+        if "action_fields" in description else ACTION_DTYPE
+    observations = np.memmap(prefix + ".observations.bin", dtype=description["dtype"], mode="r",
+                             shape=(description["turns"],) + tuple(description["observation_shape"])) \
+        if description["turns"] else np.zeros((0,), dtype=description["dtype"])
+    actions = np.memmap(prefix + ".actions.bin", dtype=action_dtype, mode="r", shape=(description["actions"],)) \
+        if description["actions"] else np.zeros(0, dtype=action_dtype)
+    return observations, actions, description
+
+
+class JsonStream:
+    """
+    Reads a JSON document from a text stream value by value, keeping only a window of it in memory.
+    """
+    def __init__(self, stream, chunk_size=1 << 18):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Reads another chunk, dropping what was consumed. Returns False at the end of the stream."""
+        if self._eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        self._eof = not chunk
+        return bool(chunk)
+
+    def _next_char(self):
+        """Skips whitespace and returns the next character without consuming it, "" at the end."""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in " \t\r\n":
+                self._position += 1
+            if self._position < len(self._buffer) or not self._fill():
+                return self._buffer[self._position:self._position + 1]
+
+    def _expect(self, characters):
+        character = self._next_char()
+        if not character or character not in characters:
+            raise ValueError("Expected one of {!r} in JSON stream, found {!r}".format(characters, character))
+        self._position += 1
+        return character
+
+    def value(self):
+        """
+        :return: The next complete JSON value
+        """
+        self._next_char()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # A number or literal ending with the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def members(self):
+        """
+        Iterates over the keys of the object starting here. The caller consumes each key's value,
+        with value or elements, before asking for the next key.
+        :return: Generator of keys
+        """
+        self._expect("{")
+        if self._next_char() == "}":
+            self._position += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def elements(self):
+        """
+        Iterates over the values of the array starting here.
+        :return: Generator of values
+        """
+        self._expect("[")
+        if self._next_char() == "]":
+            self._position += 1
+            return
+        while True:
+            yield self.value()
+            if self._expect(",]") == "]":
+                return
+
+
+def open_recording(path):
+    """
+    :param path: A .hlt, .json or .txt recording
+    :return: A text stream of it
+    """
+    if not path.endswith(".hlt"):
+        return open(path)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading .hlt replays needs the zstandard package: pip install zstandard")
+    return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+                            encoding="utf-8")
+
+
+def replay_header(path):
+    """
+    Reads everything of a replay but its frames, skipping over them if they come first.
+    :return: Dict of the replay's top level entries but full_frames
+    """
+    header = {}
+    with open_recording(path) as stream:
+        document = JsonStream(stream)
+        for key in document.members():
+            if key == "full_frames":
+                for _ in document.elements():
+                    pass
+            else:
+                header[key] = document.value()
+    return header
+
+
+def replay_frames(path):
+    """
+    :return: Generator of a replay's full frames
+    """
+    with open_recording(path) as stream:
+        document = JsonStream(stream)
+        for key in document.members():
+            if key == "full_frames":
+                yield from document.elements()
+                return
+            document.value()
+
+
+class ReplayState:
+    """
+    The game state of a replay, turn by turn, as the hlt objects a bot would see.
+    """
+    def __init__(self, header):
+        production = header["production_map"]
+        width, height = production["width"], production["height"]
+        cells = [[MapCell(Position(x, y), production["grid"][y][x]["energy"]) for x in range(width)]
+                 for y in range(height)]
+        self.game_map = GameMap(cells, width, height)
+        self.players = {}
+        for player in header["players"]:
+            factory = player["factory_location"]
+            player_id = player["player_id"]
+            self.players[player_id] = Player(player_id, Shipyard(player_id, -1, Position(factory["x"], factory["y"])))
+
+    def apply(self, frame):
+        """
+        Moves the state to the start of the frame's turn.
+        :param frame: A full frame of the replay
+        :return: nothing.
+        """
+        self.game_map.changed_cells = []
+        for cell in frame.get("cells", ()):
+            self.game_map[Position(cell["x"], cell["y"])].halite_amount = cell["production"]
+            self.game_map.changed_cells.append((cell["x"], cell["y"], cell["production"]))
+        for event in frame.get("events", ()):
+            if event["type"] == "construct":
+                location = event["location"]
+                owner = self.players[event["owner_id"]]
+                owner._dropoffs[event["id"]] = Dropoff(event["owner_id"], event["id"],
+                                                      Position(location["x"], location["y"]))
+        for player_id, player in self.players.items():
+            entities = frame.get("entities", {}).get(str(player_id), {})
+            player._ships = {int(ship_id): Ship(player_id, int(ship_id), Position(ship["x"], ship["y"]), ship["energy"])
+                             for ship_id, ship in entities.items()}
+
+
+class _PlayerView:
+    """What a FeatureBuilder needs of a game, from one player's point of view."""
+    def __init__(self, state, player_id):
+        self.my_id = player_id
+        self.players = state.players
+        self.game_map = state.game_map
+
+
+def convert_replay(path, output_prefix, dtype=np.float32):
+    """
+    Writes one shard per player of an engine replay.
+    :param path: The replay
+    :param output_prefix: Shards are written to <output_prefix>-p<player id>
+    :return: List of (shard prefix, turns, actions)
+    """
+    state = ReplayState(replay_header(path))
+    views = {player_id: _PlayerView(state, player_id) for player_id in state.players}
+    builders = {player_id: FeatureBuilder(view, dtype) for player_id, view in views.items()}
+    writers = {player_id: ShardWriter("{}-p{}".format(output_prefix, player_id), dtype) for player_id in views}
+    for frame in replay_frames(path):
+        state.apply(frame)
+        for player_id, player in state.players.items():
+            turn = writers[player_id].write_observation(builders[player_id].build(views[player_id]))
+            commands = {move["id"]: move for move in frame.get("moves", {}).get(str(player_id), ())
+                        if move["type"] in ("m", "c")}
+            rows = []
+            for ship in player.get_ships():
+                move = commands.get(ship.id)
+                if move is None:
+                    action = COMMAND_ACTIONS["o"]
+                elif move["type"] == "c":
+                    action = CONSTRUCT
+                else:
+                    action = COMMAND_ACTIONS[move["direction"]]
+                rows.append((turn, ship.id, ship.position.x, ship.position.y, action))
+            writers[player_id].write_actions(rows)
+    for player_id, writer in writers.items():
+        writer.close(source=os.path.basename(path), player=player_id)
+    return [(writer.prefix, writer.turns, writer.actions) for writer in writers.values()]
+
+
+def inferred_action(before, after, width, height):
+    """
+    :return: The action that moved a ship from position before to position after on a wrapping map
+    """
+    offset = ((after.x - before.x) % width, (after.y - before.y) % height)
+    return {(0, 0): 0, (0, height - 1): 1, (0, 1): 2, (1, 0): 3, (width - 1, 0): 4}.get(offset)
+
+
+def convert_frames(path, output_prefix, dtype=np.float32):
+    """
+    Writes the shard of a frame recording, inferring every ship's action from the next frame.
+    :param path: The recording
+    :param output_prefix: The shard is written to <output_prefix>
+    :return: List of one (shard prefix, turns, actions)
+    """
+    stdin = sys.stdin
+    with open_recording(path) as recording:
+        sys.stdin = recording
+        try:
+            try:
+                game = hlt.Game(log_level=None)
+            except SystemExit as error:
+                # read_input exits at the end of the input, as a bot should but a converter should not
+                raise EOFError("{} ends before its first frame".format(path)) from error
+            builder = FeatureBuilder(game, dtype)
+            writer = ShardWriter(output_prefix, dtype)
+            width, height = game.game_map.width, game.game_map.height
+            previous = {}
+            while True:
+                try:
+                    game.update_frame()
+                except SystemExit:
+                    break
+                ships = {ship.id: ship for ship in game.me.get_ships()}
+                structures = [dropoff.position for dropoff in game.me.get_dropoffs()]
+                rows = []
+                for ship_id, (turn, ship) in previous.items():
+                    if ship_id in ships:
+                        action = inferred_action(ship.position, ships[ship_id].position, width, height)
+                    else:
+                        # Vanished ships either became a dropoff or were destroyed, which has no label
+                        action = CONSTRUCT if ship.position in structures else None
+                    if action is not None:
+                        rows.append((turn, ship_id, ship.position.x, ship.position.y, action))
+                writer.write_actions(rows)
+                turn = writer.write_observation(builder.build(game))
+                previous = {ship_id: (turn, ship) for ship_id, ship in ships.items()}
+        finally:
+            sys.stdin = stdin
+    writer.close(source=os.path.basename(path), player=game.my_id)
+    return [(writer.prefix, writer.turns, writer.actions)]
+
+
+def convert(path, output_dir, dtype=np.float32):
+    """
+    Converts one recording, choosing the reader by extension.
+    :return: List of (shard prefix, turns, actions)
+    """
+    output_prefix = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    if path.endswith(".txt"):
+        return convert_frames(path, output_prefix, dtype)
+    return convert_replay(path, output_prefix, dtype)
+
+
+def convert_directory(input_dir, output_dir, dtype=np.float32, workers=None, log=sys.stderr):
+    """
+    Converts every recording in a directory on all cores.
+    :return: List of (shard prefix, turns, actions) of all shards written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                   if name.endswith(RECORDING_EXTENSIONS))
+    shards = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {executor.submit(convert, path, output_dir, dtype): path for path in paths}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                shards.extend(future.result())
+            except (OSError, EOFError, ValueError, KeyError, ImportError) as error:
+                print("Failed to convert {}: {}".format(futures[future], error), file=log)
+    return sorted(shards)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="directory of .hlt replays, .json replays and .txt frame recordings")
+    parser.add_argument("output_dir", help="directory for the shards")
+    parser.add_argument("--dtype", choices=("float32", "uint16"), default="float32", help="observation type")
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to all cores")
+    args = parser.parse_args()
+
+    shards = convert_directory(args.input_dir, args.output_dir, np.dtype(args.dtype), args.workers)
+    print("{} shards, {} turns, {} actions".format(len(shards), sum(turns for _, turns, _ in shards),
+                                                   sum(actions for _, _, actions in shards)))
+
+
+if __name__ == "__main__":
+    main()
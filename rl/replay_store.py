@@ -0,0 +1,212 @@
+"""
+Disk-backed replay store for datasets larger than memory.
+
+Transitions are fixed-size records appended to shard files of shard_size records each,
+memory-mapped so the operating system pages them in and out instead of the process
+holding them. The only state kept in RAM is index.json: the record layout and how many
+records were written. One process writes; any number of training processes can open the
+same directory read-only and call refresh() to see what was appended since.
+
+A store with a capacity is a ring: once full, every record overwrites the oldest one, so
+its files never grow past capacity records. Readers then leave out the shard the writer
+overwrites next, so they do not sample records while they are being replaced.
+
+    store = ReplayStore("replay/selfplay")
+    store.add(state, action, reward, next_state, done)
+    store.flush()
+
+    reader = ReplayStore("replay/selfplay", readonly=True)
+    batch = reader.sample(256)
+"""
+import json
+import os
+
+import numpy as np
+
+from .replay_buffer import Batch
+
+INDEX_FILE = "index.json"
+
+
+def record_dtype(state_shape, state_dtype):
+    """
+    :return: The structured dtype of one stored transition
+    """
+    return np.dtype([("state", state_dtype, tuple(state_shape)), ("next_state", state_dtype, tuple(state_shape)),
+                     ("action", np.int64), ("reward", np.float32), ("done", np.float32)])
+
+
+class ReplayStore:
+    """
+    Append-only sharded transition store with the sampling interface of ReplayBuffer.
+    """
+    def __init__(self, directory, state_shape=None, state_dtype=np.float32, shard_size=65536, readonly=False,
+                 seed=None, capacity=None):
+        """
+        :param directory: Directory of the store, created if missing unless readonly
+        :param state_shape: Shape of one state, None to take it from the index or the first state added
+        :param state_dtype: Type states are stored as, only used for a new store
+        :param shard_size: Records per shard file, only used for a new store
+        :param readonly: Open for sampling only, as training processes sharing a store do
+        :param seed: Seed of the sampling generator
+        :param capacity: Records kept at most, a multiple of shard_size of at least two shards; None to
+            keep all. Only used for a new store
+        """
+        self.directory = directory
+        self.readonly = readonly
+        self._random = np.random.default_rng(seed)
+        self._shards = []
+        self._count = 0
+        self._dtype = None
+        self._state_dtype = np.dtype(state_dtype)
+        self._dirty = set()
+        self.shard_size = shard_size
+        if capacity is not None and (capacity % shard_size or capacity < 2 * shard_size):
+            raise ValueError("Capacity {} is not a multiple of at least two shards of {}".format(capacity, shard_size))
+        self.capacity = capacity
+        if os.path.exists(os.path.join(directory, INDEX_FILE)):
+            self.refresh()
+        elif readonly:
+            raise FileNotFoundError("No replay store in {}".format(directory))
+        else:
+            os.makedirs(directory, exist_ok=True)
+            if state_shape is not None:
+                self._dtype = record_dtype(state_shape, state_dtype)
+                self._write_index()
+
+    def __len__(self):
+        return self._count - self._oldest()
+
+    def _oldest(self):
+        """The first record number that can be read, after those overwritten or about to be."""
+        # Once full, the next record already goes to the first shard
+        if self.capacity is None or self._count < self.capacity:
+            return 0
+        return self._count - self.capacity + (self.shard_size if self.readonly else 0)
+
+    def _shard_path(self, number):
+        return os.path.join(self.directory, "shard-{:05}.bin".format(number))
+
+    def _shard(self, number):
+        """Maps a shard, creating it at its full size when the writer first reaches it."""
+        while len(self._shards) <= number:
+            path = self._shard_path(len(self._shards))
+            mode = "r" if self.readonly else ("r+" if os.path.exists(path) else "w+")
+            self._shards.append(np.memmap(path, dtype=self._dtype, mode=mode, shape=(self.shard_size,)))
+        return self._shards[number]
+
+    def _write_index(self):
+        index = {"state_shape": list(self._dtype["state"].shape), "state_dtype": self._dtype["state"].base.str,
+                 "shard_size": self.shard_size, "capacity": self.capacity, "count": self._count}
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w") as index_file:
+            json.dump(index, index_file)
+        os.replace(path + ".tmp", path)
+
+    def refresh(self):
+        """
+        Rereads the index, picking up records another process appended and flushed.
+        :return: nothing.
+        """
+        with open(os.path.join(self.directory, INDEX_FILE)) as index_file:
+            index = json.load(index_file)
+        self._dtype = record_dtype(index["state_shape"], np.dtype(index["state_dtype"]))
+        self.shard_size = index["shard_size"]
+        self.capacity = index.get("capacity")
+        self._count = index["count"]
+
+    def add(self, state, action, reward, next_state, done):
+        """
+        Appends one transition. It becomes visible to other processes after the next flush.
+        :param state: The state, with or without a leading batch axis of 1
+        :return: nothing.
+        """
+        if self.readonly:
+            raise ValueError("Replay store {} is read-only".format(self.directory))
+        state = np.asarray(state)
+        if self._dtype is None:
+            shape = state.shape[1:] if state.ndim > 1 and state.shape[0] == 1 else state.shape
+            self._dtype = record_dtype(shape, self._state_dtype)
+        slot = self._count if self.capacity is None else self._count % self.capacity
+        self._dirty.add(slot // self.shard_size)
+        record = self._shard(slot // self.shard_size)[slot % self.shard_size]
+        shape = self._dtype["state"].shape
+        record["state"] = state.reshape(shape)
+        record["next_state"] = np.asarray(next_state).reshape(shape)
+        record["action"] = action
+        record["reward"] = reward
+        record["done"] = done
+        self._count += 1
+
+    def flush(self):
+        """
+        Writes appended records to disk, then publishes their count in the index.
+        :return: nothing.
+        """
+        if self.readonly or self._dtype is None:
+            return
+        for number in self._dirty:
+            self._shards[number].flush()
+        self._dirty.clear()
+        self._write_index()
+
+    def close(self):
+        """
+        Flushes and unmaps all shards.
+        :return: nothing.
+        """
+        self.flush()
+        self._shards = []
+
+    def gather(self, indices):
+        """
+        Reads records into one batch in slot order, field by field from the mapped shards.
+        :param indices: Record numbers
+        :return: A Batch with weights of 1, its indices the sorted slots the records are stored in
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if self.capacity is not None:
+            indices = indices % self.capacity
+        indices = np.sort(indices)
+        batch = Batch(*(np.empty((len(indices),) + self._dtype[field].shape, dtype=self._dtype[field].base)
+                        for field in ("state", "action", "reward", "next_state", "done")),
+                      indices, np.ones(len(indices), dtype=np.float32))
+        shard_numbers, rows = np.divmod(indices, self.shard_size)
+        bounds = np.flatnonzero(np.diff(shard_numbers)) + 1
+        for start, stop in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(indices)]])):
+            shard = self._shard(shard_numbers[start])
+            for field, out in zip(("state", "action", "reward", "next_state", "done"), batch):
+                # Indexing the field view only reads the selected rows; np.take would copy the whole field first
+                out[start:stop] = shard[field][rows[start:stop]]
+        return batch
+
+    def sample(self, batch_size):
+        """
+        Samples a batch uniformly with replacement.
+        :param batch_size: Transitions in the batch
+        :return: A Batch with weights of 1
+        """
+        return self.gather(self._random.integers(self._oldest(), self._count, batch_size))
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Does nothing, the store samples uniformly. Kept so agents can use it like a ReplayBuffer.
+        :return: nothing.
+        """
+
+    def iter_batches(self, batch_size):
+        """
+        Walks the whole store in order, oldest record first. Batches are views of the mapped
+        shards, so nothing is copied until a batch is used; no batch spans two shards.
+        :param batch_size: Most transitions per batch
+        :return: Generator of Batches, their indices the slots of the records
+        """
+        start = self._oldest()
+        while start < self._count:
+            slot = start if self.capacity is None else start % self.capacity
+            number, row = divmod(slot, self.shard_size)
+            stop = min(row + batch_size, self.shard_size, row + self._count - start)
+            records = self._shard(number)[row:stop]
+            yield Batch(records["state"], records["action"], records["reward"], records["next_state"],
+                        records["done"], np.arange(slot, slot + stop - row), np.ones(stop - row, dtype=np.float32))
+            start += stop - row
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Self-play training: actor games on all cores feeding one learner.
+
+Actors are engine games of MyBot_RL.py against itself, playing the latest published policy
+with exploration. Each seat of each game slot records its transitions into its own
+ReplayStore, so every store has a single writer. The stores are rings of store_capacity
+transitions, so a long run reuses the same files instead of growing them. They live on disk
+under selfplay/ unless --experience-dir points elsewhere; in /dev/shm the memory maps are
+shared memory, of store_capacity records per seat of every worker.
+
+This process is the learner: it samples the stores read-only, trains the Keras model, and
+every publish_every updates exports it to a new policy .npz that the next games load.
+
+    python3 -m rl.selfplay --updates 20000 --map-size 32 --output policy.npz
+
+Needs TensorFlow; the actors only need NumPy.
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import tournament
+from rl.augment import Augmenter
+from rl.dqn import batch_update
+from rl.export import export
+from rl.models import policy_network
+from rl.replay_buffer import Batch
+from rl.replay_store import INDEX_FILE, ReplayStore
+
+BOT = "MyBot_RL.py"
+VIEW_SIZE = 15
+ACTIONS = 5
+DEFAULT_EXPERIENCE_DIR = os.path.join(tournament.ROOT, "selfplay")
+# Transitions per actor store file. A game flushes every 20 turns, far fewer transitions than
+# that, so the shard readers leave out covers what the actor writes before they see it
+STORE_SHARD_SIZE = 4096
+STORE_CAPACITY = 4 * STORE_SHARD_SIZE
+
+
+def actor_bot(policy, epsilon, store_dir, store_capacity=STORE_CAPACITY):
+    """
+    :return: The bot spec of an actor seat
+    """
+    return "{} --policy {} --epsilon {} --experience {} --experience-capacity {} --experience-shard-size {}".format(
+        BOT, policy, epsilon, store_dir, store_capacity, STORE_SHARD_SIZE)
+
+
+def sample_stores(stores, batch_size, generator):
+    """
+    Samples a batch uniformly over the transitions of all stores.
+    :param stores: ReplayStores
+    :param generator: A numpy Generator
+    :return: The Batch; its indices are only meaningful per store
+    """
+    sizes = np.array([len(store) for store in stores], dtype=np.float64)
+    counts = generator.multinomial(batch_size, sizes / sizes.sum())
+    batches = [store.sample(count) for store, count in zip(stores, counts) if count]
+    return Batch(*(np.concatenate(field) for field in zip(*batches)))
+
+
+class Learner:
+    """
+    Trains the policy on the actors' stores and publishes it.
+    """
+    def __init__(self, experience_dir, channels, gamma=0.95, learning_rate=0.001, target_update=1000, augment=True,
+                 seed=None):
+        """
+        :param experience_dir: Directory holding the actor stores and published policies
+        :param channels: Feature channels, 1 + 3 * players
+        :param target_update: Updates between target network syncs
+        :param augment: Whether to train on randomly rotated and mirrored views
+        """
+        self.experience_dir = experience_dir
+        self.gamma = gamma
+        self.target_update = target_update
+        input_shape = (VIEW_SIZE, VIEW_SIZE, channels)
+        self.model = policy_network(input_shape, ACTIONS, learning_rate)
+        self.target_model = policy_network(input_shape, ACTIONS, learning_rate)
+        self.target_model.set_weights(self.model.get_weights())
+        self.updates = 0
+        self.version = -1
+        self._stores = {}
+        self._random = np.random.default_rng(seed)
+        # Views are centred on their ship, so they are turned but never shifted
+        self._augment = Augmenter(VIEW_SIZE, shift=False) if augment else None
+
+    def publish(self):
+        """
+        Exports the current model as the next policy version.
+        :return: Path of the policy file
+        """
+        self.version += 1
+        path = os.path.join(self.experience_dir, "policy-{:05}.npz".format(self.version))
+        export(self.model, path + ".tmp.npz")
+        os.replace(path + ".tmp.npz", path)
+        return path
+
+    def refresh(self):
+        """
+        Opens stores that appeared since the last call and picks up what was appended to the others.
+        :return: Transitions available
+        """
+        for name in os.listdir(self.experience_dir):
+            directory = os.path.join(self.experience_dir, name)
+            if name not in self._stores and os.path.exists(os.path.join(directory, INDEX_FILE)):
+                self._stores[name] = ReplayStore(directory, readonly=True)
+        for store in self._stores.values():
+            store.refresh()
+        return sum(len(store) for store in self._stores.values())
+
+    def update(self, batch_size):
+        """
+        Applies one batched Q-learning update.
+        :return: The training loss
+        """
+        stores = [store for store in self._stores.values() if len(store)]
+        batch = sample_stores(stores, batch_size, self._random)
+        if self._augment is not None:
+            batch = self._augment(batch, self._random)
+        loss, _ = batch_update(self.model, batch, self.gamma, self.target_model)
+        self.updates += 1
+        if self.updates % self.target_update == 0:
+            self.target_model.set_weights(self.model.get_weights())
+        return loss
+
+
+def train(updates, map_size, players=2, workers=None, epsilon=0.1, batch_size=256, publish_every=500,
+          refresh_every=50, min_transitions=5000, experience_dir=DEFAULT_EXPERIENCE_DIR,
+          engine=tournament.DEFAULT_ENGINE, timeout=600, augment=True, store_capacity=STORE_CAPACITY, log=sys.stderr):
+    """
+    Runs actor games on workers processes while training in this one.
+    :param updates: Learner updates to run
+    :param players: Seats per game, all played by the policy
+    :param workers: Concurrent games, defaults to all cores but one
+    :param epsilon: Actor exploration rate
+    :param publish_every: Updates between two policy versions
+    :param refresh_every: Updates between two looks at the stores
+    :param min_transitions: Transitions to collect before the first update
+    :param augment: Whether to train on randomly rotated and mirrored views
+    :param store_capacity: Transitions every actor seat keeps, a multiple of STORE_SHARD_SIZE
+    :return: The learner
+    """
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    os.makedirs(experience_dir, exist_ok=True)
+    learner = Learner(experience_dir, 1 + 3 * players, augment=augment)
+    policy = learner.publish()
+    play = tournament.PlayMatch(engine, timeout)
+    games = {}
+    seed = 0
+
+    def start_game(executor, slot):
+        nonlocal seed
+        seed += 1
+        bots = [actor_bot(policy, epsilon, os.path.join(experience_dir, "slot-{:03}-seat-{}".format(slot, seat)),
+                          store_capacity)
+                for seat in range(players)]
+        games[executor.submit(play, tournament.Match(bots, map_size, seed))] = slot
+
+    available = 0
+    # Spawned, not forked: this process may already hold an initialised TensorFlow, which does not survive a fork
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context("spawn")) as executor:
+        for slot in range(workers):
+            start_game(executor, slot)
+        while learner.updates < updates:
+            for future in [future for future in games if future.done()]:
+                slot = games.pop(future)
+                try:
+                    future.result()
+                except (subprocess.SubprocessError, OSError, ValueError, KeyError) as error:
+                    print("Failed self-play game: {}".format(error), file=log)
+                start_game(executor, slot)
+
+            if learner.updates % refresh_every == 0 or available < min_transitions:
+                available = learner.refresh()
+            if available < min_transitions:
+                time.sleep(1)
+                continue
+            loss = learner.update(batch_size)
+            if learner.updates % publish_every == 0:
+                policy = learner.publish()
+                print("Update {}: loss {:.4f} over {} transitions, published {}".format(
+                    learner.updates, loss, available, policy), file=log)
+        for future in games:
+            future.cancel()
+    return learner
+
+
+def clean_experience(experience_dir, remove_dir=False):
+    """
+    Deletes what training wrote into a directory, the actor stores and published policies, and
+    nothing else in it.
+    :param remove_dir: Whether to also remove the directory itself if that leaves it empty
+    :return: nothing.
+    """
+    for name in os.listdir(experience_dir):
+        path = os.path.join(experience_dir, name)
+        if name.startswith("slot-") and os.path.isdir(path):
+            shutil.rmtree(path)
+        elif name.startswith("policy-") and name.endswith(".npz"):
+            os.remove(path)
+    if remove_dir and not os.listdir(experience_dir):
+        os.rmdir(experience_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=20000, help="learner updates to run")
+    parser.add_argument("--map-size", type=int, default=32)
+    parser.add_argument("--players", type=int, default=2, choices=(2, 4))
+    parser.add_argument("--workers", type=int, help="concurrent games, defaults to all cores but one")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="actor exploration rate")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--publish-every", type=int, default=500, help="updates between policy versions")
+    parser.add_argument("--experience-dir", default=DEFAULT_EXPERIENCE_DIR,
+                        help="directory of the actor stores, e.g. in /dev/shm to keep them in memory")
+    parser.add_argument("--store-capacity", type=int, default=STORE_CAPACITY,
+                        help="transitions every actor seat keeps, a multiple of {}".format(STORE_SHARD_SIZE))
+    parser.add_argument("--no-augment", action="store_true", help="train on the views as recorded")
+    parser.add_argument("--clean-experience", action="store_true",
+                        help="delete the actor stores and policy versions from --experience-dir after training")
+    parser.add_argument("--engine", default=tournament.DEFAULT_ENGINE, help="path of the Halite executable")
+    parser.add_argument("--output", default="policy.npz", help="file for the final policy")
+    args = parser.parse_args()
+
+    created = not os.path.exists(args.experience_dir)
+    learner = train(args.updates, args.map_size, args.players, args.workers, args.epsilon, args.batch_size,
+                    args.publish_every, experience_dir=args.experience_dir, engine=args.engine,
+                    augment=not args.no_augment, store_capacity=args.store_capacity)
+    shutil.copyfile(learner.publish(), args.output)
+    if args.clean_experience:
+        clean_experience(args.experience_dir, created)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Teacher logging: records the heuristic bot's decisions as an imitation learning shard.
+
+Every turn the observation is copied into an in-memory chunk and every ship's command is
+parsed into a TEACHER_DTYPE record, its ACTION_DTYPE fields plus the ship's ship_status.
+Full chunks go to a writer thread, so the bot's turn only pays for the copy. The shard
+has the layout of rl.replay_dataset and is read with load_shard:
+
+    teacher = TeacherLogger(game, "teacher/game-p0")
+    teacher.observe(game)
+    command_queue = play_turn(game, ship_status, scheduler, params)
+    teacher.record(game, command_queue, ship_status)
+"""
+import atexit
+import queue
+import threading
+
+import numpy as np
+
+from hlt import commands
+from hlt.features import FeatureBuilder
+
+from .replay_dataset import ACTION_DTYPE, COMMAND_ACTIONS, CONSTRUCT, ShardWriter
+
+# Values of MyBot's ship_status, recorded by index; a ship without one is recorded as -1
+STATUSES = ("exploring", "harvesting", "returning", "takeoffnorth", "takeoffsouth")
+
+TEACHER_DTYPE = np.dtype(ACTION_DTYPE.descr + [("status", np.int8)])
+
+
+class TeacherLogger:
+    """
+    Buffers a bot's observations and decisions and writes them out in the background.
+    """
+    def __init__(self, game, prefix, flush_every=50, dtype=np.uint16):
+        """
+        :param game: The hlt.Game, before its first update_frame
+        :param prefix: Path of the shard without extension
+        :param flush_every: Turns buffered before they are handed to the writer
+        :param dtype: Type observations are stored as, uint16 keeps halite counts exact
+        """
+        self.flush_every = flush_every
+        self.turns = 0
+        self._player_id = game.my_id
+        self._features = FeatureBuilder(game, dtype=dtype)
+        self._writer = ShardWriter(prefix, dtype, TEACHER_DTYPE)
+        self._status_index = {status: index for index, status in enumerate(STATUSES)}
+        self._chunk = None
+        self._filled = 0
+        self._rows = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+        self._closed = False
+        atexit.register(self.close)
+
+    def observe(self, game):
+        """
+        Buffers the turn's observation. Call it every turn, right after update_frame.
+        :return: nothing.
+        """
+        features = self._features.build(game)
+        if self._chunk is None:
+            self._chunk = np.empty((self.flush_every,) + features.shape, dtype=features.dtype)
+        self._chunk[self._filled] = features
+        self._filled += 1
+
+    def record(self, game, command_queue, ship_status):
+        """
+        Buffers the decision of every ship of the observed turn.
+        :param command_queue: The commands the bot sends this turn
+        :param ship_status: MyBot's status of every ship id
+        :return: nothing.
+        """
+        actions = {}
+        for command in command_queue:
+            parts = command.split()
+            if parts[0] == commands.MOVE:
+                actions[int(parts[1])] = COMMAND_ACTIONS[parts[2]]
+            elif parts[0] == commands.CONSTRUCT:
+                actions[int(parts[1])] = CONSTRUCT
+        turn = self.turns
+        for ship in game.me.get_ships():
+            # Ships without a command stay still
+            self._rows.append((turn, ship.id, ship.position.x, ship.position.y, actions.get(ship.id, 0),
+                               self._status_index.get(ship_status.get(ship.id), -1)))
+        self.turns += 1
+        if self._filled == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Hands the buffered turns to the writer thread.
+        :return: nothing.
+        """
+        if self._filled:
+            self._queue.put((self._chunk[:self._filled], self._rows))
+            # The writer owns the handed over chunk, the next turns go into a new one
+            self._chunk = None
+            self._filled = 0
+            self._rows = []
+
+    def close(self):
+        """
+        Writes out what is buffered, waits for the writer and completes the shard.
+        Runs at exit if it was not called.
+        :return: nothing.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._writer.close(source="teacher", player=self._player_id, statuses=list(STATUSES))
+
+    def _write(self):
+        """Writer thread: appends chunks to the shard until close."""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            observations, rows = chunk
+            self._writer.write_observations(observations)
+            self._writer.write_actions(rows)
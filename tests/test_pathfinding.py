@@ -0,0 +1,21 @@
+import types
+
+from hlt.pathfinding import CooperativePlanner
+from hlt.positionals import Position
+
+
+def test_goes_around_a_static_blocker():
+    planner = CooperativePlanner(16, 16)
+    ship = types.SimpleNamespace(id=1, position=Position(5, 8), halite_amount=900)
+    goal = (8, 8)
+    # Ships that never move: one on the shortest path, none next to the goal
+    blocked = [(6, 8), (2, 2), (12, 13)]
+    for turn in range(1, 8):
+        if (ship.position.x, ship.position.y) == goal:
+            break
+        dx, dy = planner.plan(turn, [ship], {ship.id: goal}, blocked)[ship.id]
+        ship.position = Position((ship.position.x + dx) % 16, (ship.position.y + dy) % 16)
+        assert (ship.position.x, ship.position.y) not in blocked
+    assert (ship.position.x, ship.position.y) == goal
+    # A shortest path of 3 moves plus the 2 of going around the blocker
+    assert turn == 6
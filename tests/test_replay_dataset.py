@@ -0,0 +1,29 @@
+import io
+import os
+
+from benchmarks.synthetic import SyntheticGame
+from rl.replay_dataset import convert_directory, load_shard
+
+
+def write_recording(path, lines):
+    with open(path, "w") as recording:
+        recording.write("".join(line + "\n" for line in lines))
+
+
+def test_truncated_recordings_fail_alone(tmp_path):
+    synthetic = SyntheticGame(32, 2, 5, seed=1)
+    input_dir, output_dir = tmp_path / "recordings", tmp_path / "shards"
+    input_dir.mkdir()
+    write_recording(input_dir / "complete.txt",
+                    synthetic.init_lines() + [line for turn in (1, 2, 3) for line in synthetic.frame_lines(turn)])
+    write_recording(input_dir / "empty.txt", [])
+    write_recording(input_dir / "truncated.txt", synthetic.init_lines()[:5])
+
+    log = io.StringIO()
+    shards = convert_directory(str(input_dir), str(output_dir), workers=1, log=log)
+
+    assert [os.path.basename(prefix) for prefix, _, _ in shards] == ["complete"]
+    assert shards[0][1] == 3
+    assert load_shard(shards[0][0])[0].shape[0] == 3
+    failures = log.getvalue()
+    assert "empty.txt" in failures and "truncated.txt" in failures
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Tournament runner for local bot versions.
+
+Plays games between bots with the Halite engine on all cores, sweeping map sizes,
+player counts and seeds, and ranks the bots by Elo with bootstrap confidence intervals.
+Head-to-head pairings stop early once a sequential probability ratio test (SPRT)
+decides which of the two bots is stronger.
+
+    python3 tournament.py MyBot.py MyBotv9.py MyBotv8.py --map-sizes 32 48 --seeds 20
+"""
+import argparse
+import collections
+import concurrent.futures
+import glob
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import match_store
+from hlt.networking import LOG_DIR_VARIABLE
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def find_engine():
+    """
+    :return: Path of the Halite executable for this platform: the one next to this script, else the
+        one on the PATH, else where it is expected next to this script
+    """
+    name = "halite.exe" if os.name == "nt" else "halite"
+    local = os.path.join(ROOT, name)
+    if os.path.isfile(local):
+        return local
+    return shutil.which(name) or local
+
+
+DEFAULT_ENGINE = find_engine()
+
+Match = collections.namedtuple("Match", "bots map_size seed")
+
+
+def default_bots():
+    """
+    :return: All bot scripts in the repository
+    """
+    patterns = ("MyBot*.py", "RandomBot.py", "Benchmark*.py")
+    return sorted(os.path.basename(path) for pattern in patterns for path in glob.glob(os.path.join(ROOT, pattern)))
+
+
+def engine_command(engine, match, python=sys.executable):
+    """
+    Builds the engine command line of a match.
+    :param engine: Path of the Halite executable
+    :param match: The match to play, bots are script names optionally followed by their arguments
+    :param python: The Python interpreter running the bots
+    :return: The argument list
+    """
+    command = [engine, "--results-as-json", "--no-logs", "--no-replay",
+               "--width", str(match.map_size), "--height", str(match.map_size), "-s", str(match.seed)]
+    for bot in match.bots:
+        # A bot may carry arguments after its script name, e.g. "MyBot.py --params tuned.json"
+        script, _, arguments = bot.partition(" ")
+        command.append('"{}" "{}" {}'.format(python, os.path.join(ROOT, script), arguments).rstrip())
+    return command
+
+
+def play_match(match, engine=DEFAULT_ENGINE, timeout=None, log_dir=None):
+    """
+    Plays one game with the engine. The bots write their log files into a directory of their own,
+    so games played at the same time do not overwrite each other's.
+    :param match: The match to play
+    :param engine: Path of the Halite executable
+    :param timeout: Seconds before the game is killed, None to wait forever
+    :param log_dir: Directory to keep every game's bot logs in, one subdirectory per game; None to discard them
+    :return: Dict with the rank (1 is best) and score of every seat
+    """
+    if log_dir is None:
+        with tempfile.TemporaryDirectory(prefix="hlt-match-") as game_dir:
+            return _play(match, engine, timeout, game_dir)
+    os.makedirs(log_dir, exist_ok=True)
+    game_dir = tempfile.mkdtemp(prefix="{}x{}-seed{}-".format(match.map_size, match.map_size, match.seed),
+                                dir=log_dir)
+    return _play(match, engine, timeout, game_dir)
+
+
+def _play(match, engine, timeout, game_dir):
+    environment = dict(os.environ, **{LOG_DIR_VARIABLE: game_dir})
+    output = subprocess.check_output(engine_command(engine, match), cwd=ROOT, timeout=timeout,
+                                     stderr=subprocess.DEVNULL, env=environment)
+    stats = json.loads(output.decode())["stats"]
+    seats = range(len(match.bots))
+    return {
+        "ranks": [stats[str(seat)]["rank"] for seat in seats],
+        "scores": [stats[str(seat)]["score"] for seat in seats],
+    }
+
+
+class PlayMatch:
+    """Picklable play_match with a fixed engine, timeout and log directory, for use in worker processes."""
+    def __init__(self, engine=DEFAULT_ENGINE, timeout=None, log_dir=None):
+        self.engine = engine
+        self.timeout = timeout
+        self.log_dir = log_dir
+
+    def __call__(self, match):
+        return play_match(match, self.engine, self.timeout, self.log_dir)
+
+
+def pairwise_scores(match, result):
+    """
+    Splits a game into head-to-head results between every two seats.
+    :param match: The match played
+    :param result: Its result
+    :return: List of (bot, opponent, score) with score 1 for a win, 0.5 for a tie and 0 for a loss
+    """
+    scores = []
+    for first, second in itertools.combinations(range(len(match.bots)), 2):
+        first_rank, second_rank = result["ranks"][first], result["ranks"][second]
+        score = 1.0 if first_rank < second_rank else 0.5 if first_rank == second_rank else 0.0
+        scores.append((match.bots[first], match.bots[second], score))
+    return scores
+
+
+def elo_ratings(scores, bots, iterations=200):
+    """
+    Fits Bradley-Terry strengths to head-to-head scores and expresses them as Elo ratings
+    averaging 0. Every pairing gets one virtual tie, so unbeaten bots keep a finite rating.
+    :param scores: List of (bot, opponent, score)
+    :param bots: All bots to rate
+    :param iterations: Minorization-maximization iterations
+    :return: Dict of bot to rating
+    """
+    wins = collections.defaultdict(float)
+    games = collections.defaultdict(float)
+    for first, second in itertools.combinations(bots, 2):
+        wins[first] += 0.5
+        wins[second] += 0.5
+        games[first, second] += 1
+        games[second, first] += 1
+    for bot, opponent, score in scores:
+        wins[bot] += score
+        wins[opponent] += 1 - score
+        games[bot, opponent] += 1
+        games[opponent, bot] += 1
+
+    strength = {bot: 1.0 for bot in bots}
+    for _ in range(iterations):
+        updated = {}
+        for bot in bots:
+            denominator = sum(games[bot, opponent] / (strength[bot] + strength[opponent])
+                              for opponent in bots if opponent != bot)
+            updated[bot] = wins[bot] / denominator
+        norm = math.exp(sum(math.log(value) for value in updated.values()) / len(bots))
+        strength = {bot: value / norm for bot, value in updated.items()}
+    return {bot: 400 * math.log10(value) for bot, value in strength.items()}
+
+
+def rating_intervals(games, bots, samples=200, confidence=0.95, seed=0):
+    """
+    Bootstrap confidence intervals of the Elo ratings, resampling whole games.
+    :param games: List of per-game pairwise score lists
+    :param bots: All bots to rate
+    :param samples: Bootstrap resamples
+    :param confidence: Width of the interval
+    :param seed: Seed of the resampling
+    :return: Dict of bot to (low, high)
+    """
+    generator = random.Random(seed)
+    resampled = collections.defaultdict(list)
+    for _ in range(samples):
+        scores = [score for _ in games for score in generator.choice(games)]
+        for bot, rating in elo_ratings(scores, bots, iterations=50).items():
+            resampled[bot].append(rating)
+    tail = (1 - confidence) / 2
+    intervals = {}
+    for bot, ratings in resampled.items():
+        ratings.sort()
+        intervals[bot] = (ratings[int(tail * (samples - 1))], ratings[int((1 - tail) * (samples - 1))])
+    return intervals
+
+
+class Sprt:
+    """
+    Sequential probability ratio test between "the first bot is elo_margin weaker" and
+    "the first bot is elo_margin stronger", on the stream of head-to-head scores.
+    """
+    def __init__(self, elo_margin=20, alpha=0.05, beta=0.05):
+        """
+        :param elo_margin: Elo difference the two hypotheses are apart from even
+        :param alpha: Probability of wrongly deciding the first bot is stronger
+        :param beta: Probability of wrongly deciding the first bot is weaker
+        """
+        self._expected_weaker = 1 / (1 + 10 ** (elo_margin / 400))
+        self._expected_stronger = 1 - self._expected_weaker
+        self._lower = math.log(beta / (1 - alpha))
+        self._upper = math.log((1 - beta) / alpha)
+        self.llr = 0.0
+        self.games = 0
+
+    def update(self, score):
+        """
+        Adds one game's score of the first bot; ties add half a win and half a loss.
+        :param score: 1, 0.5 or 0
+        :return: nothing.
+        """
+        self.games += 1
+        self.llr += score * math.log(self._expected_stronger / self._expected_weaker)
+        self.llr += (1 - score) * math.log(self._expected_weaker / self._expected_stronger)
+
+    @property
+    def decision(self):
+        """
+        :return: 1 if the first bot is stronger, -1 if it is weaker, None while undecided
+        """
+        if self.llr >= self._upper:
+            return 1
+        if self.llr <= self._lower:
+            return -1
+        return None
+
+
+def schedule(bots, map_sizes, player_counts, seeds):
+    """
+    Lists all matches, interleaved by seed so every pairing gets results early.
+    Head-to-head games are played from both seats; 4 player games seat random tables of bots.
+    :return: List of (pairing, match); pairing is the sorted pair of bots of a 2 player match, else None
+    """
+    matches = []
+    for seed in seeds:
+        for map_size in map_sizes:
+            if 2 in player_counts:
+                for first, second in itertools.combinations(bots, 2):
+                    pairing = tuple(sorted((first, second)))
+                    matches.append((pairing, Match((first, second), map_size, seed)))
+                    matches.append((pairing, Match((second, first), map_size, seed)))
+            if 4 in player_counts and len(bots) >= 4:
+                shuffled = list(bots)
+                random.Random(seed * 1000 + map_size).shuffle(shuffled)
+                for start in range(0, len(shuffled), 4):
+                    table = shuffled[start:start + 4]
+                    table += random.Random(seed + start).sample([bot for bot in bots if bot not in table],
+                                                                4 - len(table))
+                    matches.append((None, Match(tuple(table), map_size, seed)))
+    return matches
+
+
+def run_tournament(bots, map_sizes, player_counts, seeds, play=play_match, workers=None, sprt_margin=20,
+                   alpha=0.05, beta=0.05, store=None, log=sys.stderr):
+    """
+    Plays all scheduled matches on a process pool, skipping the rest of a pairing once its SPRT decides.
+    :param play: Function playing a match and returning its result, must be picklable
+    :param workers: Worker processes, defaults to the number of cores
+    :param store: A match_store.MatchStore to reuse results from and save new ones to, or None
+    :return: List of (match, result) for all games played or reused
+    """
+    tests = collections.defaultdict(lambda: Sprt(sprt_margin, alpha, beta))
+    played = []
+
+    def record(pairing, match, result):
+        """Adds a result, returns whether it decided its pairing."""
+        played.append((match, result))
+        if pairing is None or tests[pairing].decision is not None:
+            return False
+        test = tests[pairing]
+        for bot, _, score in pairwise_scores(match, result):
+            test.update(score if bot == pairing[0] else 1 - score)
+        if test.decision is None:
+            return False
+        winner, loser = pairing if test.decision > 0 else reversed(pairing)
+        print("SPRT: {} beats {} after {} games".format(winner, loser, test.games), file=log)
+        return True
+
+    remaining = []
+    for pairing, match in schedule(bots, map_sizes, player_counts, seeds):
+        result = store.get(match) if store is not None else None
+        if result is None:
+            remaining.append((pairing, match))
+        else:
+            record(pairing, match, result)
+    if store is not None:
+        print("Reusing {} stored results, {} games left".format(len(played), len(remaining)), file=log)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {}
+        for pairing, match in remaining:
+            if pairing is None or tests[pairing].decision is None:
+                futures[executor.submit(play, match)] = (pairing, match)
+        for future in concurrent.futures.as_completed(futures):
+            pairing, match = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except (subprocess.SubprocessError, OSError, ValueError, KeyError) as error:
+                print("Failed {}: {}".format(match, error), file=log)
+                continue
+            if store is not None:
+                store.put(match, result)
+            if record(pairing, match, result):
+                for other, (other_pairing, _) in futures.items():
+                    if other_pairing == pairing:
+                        other.cancel()
+    return played
+
+
+def ranking(played, bots, samples=200):
+    """
+    :param played: List of (match, result)
+    :return: List of (bot, rating, (low, high)), best first
+    """
+    games = [pairwise_scores(match, result) for match, result in played]
+    ratings = elo_ratings([score for game in games for score in game], bots)
+    intervals = rating_intervals(games, bots, samples) if games else {bot: (0, 0) for bot in bots}
+    return sorted(((bot, ratings[bot], intervals[bot]) for bot in bots), key=lambda row: -row[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("bots", nargs="*", help="bot scripts, defaults to all in the repository")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, help="path of the Halite executable")
+    parser.add_argument("--map-sizes", type=int, nargs="+", default=[32, 40, 48, 56, 64])
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 4], choices=[2, 4])
+    parser.add_argument("--seeds", type=int, default=10, help="seeds per map size")
+    parser.add_argument("--first-seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to all cores")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds before a game is killed")
+    parser.add_argument("--sprt-margin", type=float, default=20, help="Elo margin of the SPRT hypotheses")
+    parser.add_argument("--store", default=match_store.DEFAULT_PATH,
+                        help="SQLite file of stored results, only games whose sources changed are played")
+    parser.add_argument("--no-store", action="store_true", help="play every game, neither reusing nor storing")
+    parser.add_argument("--output", help="JSON file to write all game results to")
+    parser.add_argument("--log-dir", help="keep the bots' log files of every game in a subdirectory of this one")
+    args = parser.parse_args()
+    if not os.path.isfile(args.engine):
+        parser.error("no Halite executable at {}, point --engine at it".format(args.engine))
+
+    bots = args.bots or default_bots()
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    play = PlayMatch(args.engine, args.timeout, args.log_dir)
+    store = None if args.no_store else match_store.MatchStore(args.store)
+    try:
+        played = run_tournament(bots, args.map_sizes, args.players, seeds, play, args.workers, args.sprt_margin,
+                                store=store)
+    finally:
+        if store is not None:
+            store.close()
+
+    print("{:<32} {:>7} {:>17} ".format("bot", "elo", "95% interval"))
+    for bot, rating, (low, high) in ranking(played, bots):
+        print("{:<32} {:>7.1f} [{:>7.1f}, {:>7.1f}]".format(bot, rating, low, high))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump([dict(match._asdict(), **result) for match, result in played], output_file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Tunes MyBot's Parameters by successive halving.
+
+Random candidates around the current defaults play games against an opponent on all
+cores. After every round only the best 1/eta candidates survive, and the survivors play
+eta times more seeds in the next round, so most games go to the promising candidates.
+A candidate's score is its mean share of the halite both players finished with.
+
+    python3 tune_params.py --opponent MyBotv9.py --candidates 27 --map-sizes 32 48
+"""
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+
+import MyBot
+import tournament
+
+# Name: (lowest, highest, type) of every tuned parameter
+SPACE = collections.OrderedDict([
+    ("sweet_spot_halite", (150, 600, int)),
+    ("halite_coeff_max", (0.8, 2.0, float)),
+    ("low_halite", (10, 150, int)),
+    ("sweet_spot_radius", (5, 30, int)),
+    ("sweet_spot_count", (1, 6, int)),
+    ("sweet_spot_attraction", (1.2, 5.0, float)),
+    ("return_halite", (600, 1000, int)),
+    ("max_ships_small", (10, 50, int)),
+    ("max_ships_large", (10, 60, int)),
+    ("dropoff_distance", (5, 20, int)),
+    ("self_destruct_turns", (10, 50, int)),
+])
+
+DEFAULT_TUNING_DIR = "tuning"
+
+
+def default_candidate():
+    """
+    :return: The parameters MyBot currently uses
+    """
+    defaults = vars(MyBot.Parameters())
+    return {name: defaults[name] for name in SPACE}
+
+
+def sample_candidate(generator, spread=0.25):
+    """
+    Draws a candidate around the defaults, every parameter moved by a normal step
+    of spread times its range and clipped to its bounds.
+    :param generator: A random.Random
+    :param spread: Step size relative to each parameter's range
+    :return: Dict of parameter values
+    """
+    candidate = {}
+    for name, default in default_candidate().items():
+        low, high, kind = SPACE[name]
+        value = min(high, max(low, generator.gauss(default, spread * (high - low))))
+        candidate[name] = int(round(value)) if kind is int else round(value, 3)
+    return candidate
+
+
+def candidate_bot(candidate, tuning_dir=DEFAULT_TUNING_DIR):
+    """
+    Writes a candidate to a parameter file named by its content.
+    :param candidate: Dict of parameter values
+    :param tuning_dir: Directory of parameter files, relative to the repository
+    :return: The bot spec playing MyBot with these parameters
+    """
+    text = json.dumps(candidate, sort_keys=True)
+    path = os.path.join(tuning_dir, "params-{}.json".format(hashlib.sha256(text.encode()).hexdigest()[:12]))
+    os.makedirs(os.path.join(tournament.ROOT, tuning_dir), exist_ok=True)
+    with open(os.path.join(tournament.ROOT, path), "w") as params_file:
+        params_file.write(text)
+    return "MyBot.py --params {}".format(path)
+
+
+def halite_share(result, seat):
+    """
+    :return: The share of both players' final halite owned by the bot in the given seat
+    """
+    mine = result["scores"][seat]
+    total = sum(result["scores"])
+    return mine / total if total else 0.5
+
+
+def evaluate(executor, play, bots, opponent, map_sizes, seeds, log=sys.stderr):
+    """
+    Plays every candidate bot against the opponent from both seats on every map size and seed.
+    :param executor: The executor running the games
+    :param play: Function playing a match, must be picklable
+    :return: Dict of bot to list of halite shares
+    """
+    futures = {}
+    for bot in bots:
+        for map_size in map_sizes:
+            for seed in seeds:
+                futures[executor.submit(play, tournament.Match((bot, opponent), map_size, seed))] = (bot, 0)
+                futures[executor.submit(play, tournament.Match((opponent, bot), map_size, seed))] = (bot, 1)
+    shares = collections.defaultdict(list)
+    for future in concurrent.futures.as_completed(futures):
+        bot, seat = futures[future]
+        try:
+            result = future.result()
+        except (subprocess.SubprocessError, OSError, ValueError, KeyError) as error:
+            print("Failed game of {}: {}".format(bot, error), file=log)
+            continue
+        shares[bot].append(halite_share(result, seat))
+    return shares
+
+
+def successive_halving(candidates, opponent, map_sizes, play, eta=3, initial_seeds=1, first_seed=1, workers=None,
+                       tuning_dir=DEFAULT_TUNING_DIR, log=sys.stderr):
+    """
+    :param candidates: List of candidate parameter dicts
+    :param opponent: The bot candidates play against
+    :param eta: Fraction of candidates dropped per round is 1 - 1/eta; seeds grow by eta per round
+    :param initial_seeds: Seeds per map size in the first round
+    :return: List of (mean share, games, candidate) of the last survivor, the winner
+    """
+    bots = {candidate_bot(candidate, tuning_dir): candidate for candidate in candidates}
+    shares = collections.defaultdict(list)
+    survivors = list(bots)
+
+    def mean_share(bot):
+        return sum(shares[bot]) / len(shares[bot]) if shares[bot] else 0
+
+    seeds_per_round = initial_seeds
+    next_seed = first_seed
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        while True:
+            seeds = range(next_seed, next_seed + seeds_per_round)
+            next_seed += seeds_per_round
+            for bot, bot_shares in evaluate(executor, play, survivors, opponent, map_sizes, seeds, log).items():
+                shares[bot].extend(bot_shares)
+            survivors.sort(key=mean_share, reverse=True)
+            print("Round with {} candidates on {} seeds, best share {:.3f}".format(
+                len(survivors), seeds_per_round, mean_share(survivors[0])), file=log)
+            survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+            # A lone survivor has nothing left to be compared with
+            if len(survivors) == 1:
+                break
+            seeds_per_round *= eta
+    return [(mean_share(bot), len(shares[bot]), bots[bot]) for bot in survivors]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--opponent", default="MyBot.py", help="bot the candidates play against")
+    parser.add_argument("--engine", default=tournament.DEFAULT_ENGINE, help="path of the Halite executable")
+    parser.add_argument("--candidates", type=int, default=27, help="candidates in the first round")
+    parser.add_argument("--eta", type=int, default=3, help="keep 1/eta candidates per round")
+    parser.add_argument("--map-sizes", type=int, nargs="+", default=[32, 48, 64])
+    parser.add_argument("--initial-seeds", type=int, default=1, help="seeds per map size in the first round")
+    parser.add_argument("--first-seed", type=int, default=1)
+    parser.add_argument("--spread", type=float, default=0.25, help="candidate step relative to parameter range")
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to all cores")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds before a game is killed")
+    parser.add_argument("--tuning-dir", default=DEFAULT_TUNING_DIR, help="directory of candidate parameter files")
+    parser.add_argument("--output", default="tuned_params.json", help="JSON file for the best parameters")
+    args = parser.parse_args()
+
+    generator = random.Random(args.random_seed)
+    # The current defaults always compete, so tuning never returns something worse than it measured
+    candidates = [default_candidate()]
+    candidates += [sample_candidate(generator, args.spread) for _ in range(args.candidates - 1)]
+    play = tournament.PlayMatch(args.engine, args.timeout)
+    survivors = successive_halving(candidates, args.opponent, args.map_sizes, play, args.eta, args.initial_seeds,
+                                   args.first_seed, args.workers, args.tuning_dir)
+
+    share, games, best = survivors[0]
+    print("Best share {:.3f} over {} games: {}".format(share, games, json.dumps(best, sort_keys=True)))
+    with open(args.output, "w") as output_file:
+        json.dump(best, output_file, indent=1, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()